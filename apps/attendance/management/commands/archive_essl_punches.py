@@ -0,0 +1,26 @@
+from django.utils import timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.attendance.utils.attendance_sync import archive_punches
+
+
+class Command(BaseCommand):
+    help = "Move ESSL punches older than the retention window into the compact punch archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months", type=int, default=None,
+            help="Keep this many whole months of punches, plus the current one (default: ESSL_PUNCH_RETENTION_MONTHS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="Punches moved per transaction.")
+
+    def handle(self, *args, **options):
+        months = options["months"] if options["months"] is not None else settings.ESSL_PUNCH_RETENTION_MONTHS
+        today = timezone.localdate()
+        month_index = today.year * 12 + today.month - 1 - months
+        before = today.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+        archived = archive_punches(before, batch_size=options["batch_size"])
+        self.stdout.write(f"Archived {archived} punches dated before {before}.")
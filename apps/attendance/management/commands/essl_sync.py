@@ -0,0 +1,59 @@
+import signal
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.attendance.tasks import (
+    acquire_sync_lock,
+    lock_owner,
+    release_sync_lock,
+    renew_sync_lock,
+    run_essl_sync,
+    sync_requested,
+)
+
+# Seconds between checks for a sync requested through the API
+REQUEST_POLL_SECONDS = 2
+
+
+class Command(BaseCommand):
+    help = "Sync ESSL devices into attendance in the background, on a schedule and on request."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=None,
+            help="Seconds between scheduled syncs (default: ESSL_SYNC_INTERVAL).",
+        )
+        parser.add_argument("--once", action="store_true", help="Run a single sync and exit.")
+
+    def handle(self, *args, **options):
+        interval = options["interval"] if options["interval"] is not None else settings.ESSL_SYNC_INTERVAL
+        owner = lock_owner()
+
+        while not acquire_sync_lock(owner):
+            if options["once"]:
+                self.stdout.write("Another ESSL sync instance holds the lock; exiting.")
+                return
+            # Stand by until the active instance stops
+            time.sleep(interval)
+
+        # Exit through the finally block on SIGTERM so the lease is released on shutdown
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        self.stdout.write(f"ESSL sync running as {owner}, every {interval:g}s")
+        try:
+            next_run = time.monotonic()
+            while True:
+                if time.monotonic() >= next_run or sync_requested():
+                    state = run_essl_sync()
+                    self.stdout.write(f"ESSL sync {state.status}: {state.message}")
+                    next_run = time.monotonic() + interval
+                    if options["once"]:
+                        return
+                time.sleep(min(REQUEST_POLL_SECONDS, max(next_run - time.monotonic(), 0)))
+                if not renew_sync_lock(owner):
+                    self.stderr.write("ESSL sync lock was taken over by another instance; exiting.")
+                    return
+        finally:
+            release_sync_lock(owner)
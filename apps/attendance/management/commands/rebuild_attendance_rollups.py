@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.attendance.utils.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the monthly attendance rollups of a month from Attendance and Leave."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, required=True)
+        parser.add_argument("--month", type=int, required=True)
+
+    def handle(self, *args, **options):
+        rebuild_rollups(options["year"], options["month"])
+        self.stdout.write(f"Rebuilt attendance rollups for {options['month']:02d}/{options['year']}.")
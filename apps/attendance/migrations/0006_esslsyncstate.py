@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_remove_leave_approved_leave_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EsslSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_punch_id', models.BigIntegerField(default=0)),
+                ('last_punch_time', models.DateTimeField(blank=True, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:13
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicate_punches(apps, schema_editor):
+    # Keep the first copy of each punch so the unique constraint can be added
+    EsslPunch = apps.get_model('attendance', 'EsslPunch')
+    duplicates = (
+        EsslPunch.objects.values('employee_code', 'punch_time')
+        .annotate(first_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for row in duplicates:
+        EsslPunch.objects.filter(
+            employee_code=row['employee_code'], punch_time=row['punch_time']
+        ).exclude(id=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_esslsyncstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_punches, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='esslpunch',
+            unique_together={('employee_code', 'punch_time')},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_esslpunch_unique_punch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='esslconfig',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='esslconfig',
+            name='name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='esslconfig',
+            name='timeout',
+            field=models.PositiveIntegerField(default=5),
+        ),
+    ]
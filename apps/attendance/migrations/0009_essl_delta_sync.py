@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_esslconfig_multiple_devices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='esslconfig',
+            name='clear_after_ingest',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='esslconfig',
+            name='last_punch_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='esslconfig',
+            name='last_record_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='EsslSyncLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_address', models.CharField(max_length=120)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('duration_seconds', models.FloatField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('records_on_device', models.PositiveIntegerField(default=0)),
+                ('records_transferred', models.PositiveIntegerField(default=0)),
+                ('new_records', models.PositiveIntegerField(default=0)),
+                ('disabled_seconds', models.FloatField(default=0)),
+                ('cleared', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True)),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_logs', to='attendance.esslconfig')),
+            ],
+        ),
+    ]
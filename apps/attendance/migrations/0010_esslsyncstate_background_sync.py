@@ -0,0 +1,53 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_essl_delta_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='esslsyncstate',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='esslsyncstate',
+            name='lock_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='esslsyncstate',
+            name='locked_by',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='esslsyncstate',
+            name='message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='esslsyncstate',
+            name='records_processed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='esslsyncstate',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='esslsyncstate',
+            name='status',
+            field=models.CharField(choices=[('idle', 'Idle'), ('running', 'Running'), ('completed', 'Completed'), ('partial', 'Completed with device errors'), ('failed', 'Failed')], default='idle', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='esslsyncstate',
+            name='sync_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
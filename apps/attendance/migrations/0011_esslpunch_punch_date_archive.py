@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:22
+
+import django.core.serializers.json
+from django.db import migrations, models
+from django.utils import timezone
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+def backfill_punch_date(apps, schema_editor):
+    EsslPunch = apps.get_model('attendance', 'EsslPunch')
+    pending = EsslPunch.objects.filter(punch_date__isnull=True).order_by('id')
+    while True:
+        batch = list(pending[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            break
+        for punch in batch:
+            punch_time = punch.punch_time
+            punch.punch_date = (timezone.localtime(punch_time) if timezone.is_aware(punch_time) else punch_time).date()
+        EsslPunch.objects.bulk_update(batch, ['punch_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_esslsyncstate_background_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EsslPunchArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_code', models.CharField(max_length=20)),
+                ('punch_date', models.DateField()),
+                ('punch_times', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='esslpunch',
+            name='punch_date',
+            field=models.DateField(db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_punch_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='esslpunch',
+            name='punch_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='esslpunch',
+            index=models.Index(fields=['employee_code', 'punch_date'], name='esslpunch_code_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='esslpuncharchive',
+            unique_together={('employee_code', 'punch_date')},
+        ),
+    ]
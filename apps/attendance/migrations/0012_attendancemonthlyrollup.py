@@ -0,0 +1,100 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:24
+
+import django.db.models.deletion
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, datetime
+from django.db import migrations, models
+
+
+# Copies of apps.attendance.utils.rollups as of this migration, so later changes there
+# cannot alter what the backfill computes
+
+def sunday_count(year, month):
+    return sum(1 for day in range(1, monthrange(year, month)[1] + 1) if date(year, month, day).weekday() == 6)
+
+
+def worked_minutes(in_time, out_time):
+    if not in_time or not out_time or out_time <= in_time:
+        return 0
+    delta = datetime.combine(date.min, out_time) - datetime.combine(date.min, in_time)
+    return int(delta.total_seconds() // 60)
+
+
+def rollup_values(attendance_rows, leave_days, year, month):
+    present_mask = recorded_mask = leave_mask = minutes = 0
+    for day, is_present, in_time, out_time in attendance_rows:
+        recorded_mask |= 1 << day.day
+        if is_present:
+            present_mask |= 1 << day.day
+            minutes += worked_minutes(in_time, out_time)
+    for day in leave_days:
+        leave_mask |= 1 << day.day
+    return {
+        'present_mask': present_mask,
+        'recorded_mask': recorded_mask,
+        'leave_mask': leave_mask,
+        'present_days': present_mask.bit_count(),
+        'absent_days': (recorded_mask & ~present_mask).bit_count(),
+        'approved_leaves': leave_mask.bit_count(),
+        'sundays': sunday_count(year, month),
+        'worked_minutes': minutes,
+    }
+
+
+def backfill_rollups(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    Leave = apps.get_model('attendance', 'Leave')
+    AttendanceMonthlyRollup = apps.get_model('attendance', 'AttendanceMonthlyRollup')
+
+    attendance = defaultdict(list)
+    for employee_id, day, is_present, in_time, out_time in Attendance.objects.values_list(
+        'employee_id', 'date', 'is_present', 'in_time', 'out_time'
+    ).iterator():
+        attendance[(employee_id, day.year, day.month)].append((day, is_present, in_time, out_time))
+    leaves = defaultdict(list)
+    for employee_id, day in Leave.objects.filter(status='approved').values_list('employee_id', 'date').iterator():
+        leaves[(employee_id, day.year, day.month)].append(day)
+
+    rollups = []
+    for key in set(attendance) | set(leaves):
+        employee_id, year, month = key
+        rollups.append(AttendanceMonthlyRollup(
+            employee_id=employee_id, year=year, month=month,
+            **rollup_values(attendance[key], leaves[key], year, month),
+        ))
+    AttendanceMonthlyRollup.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_esslpunch_punch_date_archive'),
+        ('employees', '0007_employeededuction_is_closed_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('present_mask', models.BigIntegerField(default=0)),
+                ('recorded_mask', models.BigIntegerField(default=0)),
+                ('leave_mask', models.BigIntegerField(default=0)),
+                ('present_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('approved_leaves', models.IntegerField(default=0)),
+                ('sundays', models.IntegerField(default=0)),
+                ('worked_minutes', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='employees.employeeprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='attendancerollup_month_idx')],
+                'unique_together': {('employee', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0012_attendancemonthlyrollup'),
+        ('employees', '0007_employeededuction_is_closed_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'is_present'], name='attendance_date_present_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='esslpunch',
+            index=models.Index(fields=['punch_time'], name='esslpunch_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['status', 'date'], name='leave_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['date', 'status'], name='leave_date_status_idx'),
+        ),
+    ]
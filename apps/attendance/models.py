@@ -1,5 +1,7 @@
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from apps.employees.models import EmployeeProfile
 class Attendance(models.Model):
     employee = models.ForeignKey(EmployeeProfile, on_delete=models.CASCADE)
@@ -13,6 +15,17 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ('employee', 'date')
+        indexes = [
+            # List filters by date range, optionally with is_present; per employee the unique index serves
+            models.Index(fields=['date', 'is_present'], name='attendance_date_present_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored day so a moved row also refreshes the month it left
+        instance._loaded_key = (instance.__dict__.get('employee_id'), instance.__dict__.get('date'))
+        return instance
 
 class LeaveType(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -35,15 +48,139 @@ class Leave(models.Model):
 
     class Meta:
         unique_together = ('employee', 'date')
+        indexes = [
+            # List filters: by status (e.g. pending), by date range, or both
+            models.Index(fields=['status', 'date'], name='leave_status_date_idx'),
+            models.Index(fields=['date', 'status'], name='leave_date_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_key = (instance.__dict__.get('employee_id'), instance.__dict__.get('date'))
+        return instance
+
+class AttendanceMonthlyRollup(models.Model):
+    """
+    Attendance totals of one employee-month, kept current from Attendance and approved Leave.
+    Bit N of a mask is set for day N of the month: present_mask for present days,
+    recorded_mask for days with any attendance row, leave_mask for approved leaves.
+    absent_days counts attendance rows marked absent.
+    """
+    employee = models.ForeignKey(EmployeeProfile, on_delete=models.CASCADE, related_name='attendance_rollups')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    present_mask = models.BigIntegerField(default=0)
+    recorded_mask = models.BigIntegerField(default=0)
+    leave_mask = models.BigIntegerField(default=0)
+    present_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    approved_leaves = models.IntegerField(default=0)
+    sundays = models.IntegerField(default=0)
+    worked_minutes = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('employee', 'year', 'month')
+        indexes = [
+            models.Index(fields=['year', 'month'], name='attendancerollup_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} {self.month:02d}/{self.year}"
+
+def local_punch_time(punch_time):
+    return timezone.localtime(punch_time) if timezone.is_aware(punch_time) else punch_time
+
 
 class EsslPunch(models.Model):
     employee_code = models.CharField(max_length=20)
     punch_time = models.DateTimeField()
+    # Local calendar day of punch_time, kept in sync on save and by the bulk writers
+    punch_date = models.DateField(db_index=True)
+
+    class Meta:
+        unique_together = ('employee_code', 'punch_time')
+        indexes = [
+            models.Index(fields=['employee_code', 'punch_date'], name='esslpunch_code_date_idx'),
+            # Time-range filter across all employees; per employee the unique index serves
+            models.Index(fields=['punch_time'], name='esslpunch_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.punch_date = local_punch_time(self.punch_time).date()
+        super().save(*args, **kwargs)
+
+class EsslPunchArchive(models.Model):
+    """Punches moved out of EsslPunch by `archive_essl_punches`, one row per employee and day."""
+    employee_code = models.CharField(max_length=20)
+    punch_date = models.DateField()
+    punch_times = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        unique_together = ('employee_code', 'punch_date')
 
 class EsslConfig(models.Model):
+    # One row per biometric terminal; all active devices are polled on sync
+    name = models.CharField(max_length=100, blank=True)
     device_ip = models.CharField(max_length=100, default='192.168.1.201')
     device_port = models.IntegerField(default=4370)
+    timeout = models.PositiveIntegerField(default=5)
+    is_active = models.BooleanField(default=True)
+    clear_after_ingest = models.BooleanField(default=False)
+    # Record count at the last read, to skip unchanged logs, and the cursor: the latest punch ingested
+    last_record_count = models.PositiveIntegerField(default=0)
+    last_punch_time = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.device_ip}:{self.device_port}"
+
+class EsslSyncState(models.Model):
+    STATUS_CHOICES = (
+        ('idle', 'Idle'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('partial', 'Completed with device errors'),
+        ('failed', 'Failed'),
+    )
+
+    # Single row tracking the last punch folded into Attendance
+    last_punch_id = models.BigIntegerField(default=0)
+    last_punch_time = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    # Background sync daemon: pending request, outcome of the last run and the lease fallback lock
+    sync_requested_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='idle')
+    message = models.TextField(blank=True)
+    records_processed = models.IntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=200, blank=True)
+    lock_expires_at = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def load(cls):
+        state, _ = cls.objects.get_or_create(pk=1)
+        return state
+
+    def __str__(self):
+        return f"Punches synced up to #{self.last_punch_id}"
+
+class EsslSyncLog(models.Model):
+    """Transfer metrics of one device read during an ESSL sync."""
+    device = models.ForeignKey(EsslConfig, null=True, blank=True, on_delete=models.SET_NULL, related_name='sync_logs')
+    device_address = models.CharField(max_length=120)
+    started_at = models.DateTimeField(auto_now_add=True)
+    duration_seconds = models.FloatField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    records_on_device = models.PositiveIntegerField(default=0)
+    records_transferred = models.PositiveIntegerField(default=0)
+    new_records = models.PositiveIntegerField(default=0)
+    disabled_seconds = models.FloatField(default=0)
+    cleared = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Sync of {self.device_address} at {self.started_at}"
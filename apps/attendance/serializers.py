@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Attendance, Leave, LeaveType, EsslPunch, EsslConfig
+from payroll_system.values_serializers import ValuesSerializer
+from .models import Attendance, Leave, LeaveType, EsslPunch, EsslConfig, EsslSyncLog, EsslSyncState
 
 class AttendanceSerializer(serializers.ModelSerializer):
     employee_name = serializers.SerializerMethodField()
@@ -15,6 +16,13 @@ class AttendanceSerializer(serializers.ModelSerializer):
         return f"{obj.employee.employee_code}"
 
 
+# Same output as AttendanceSerializer, built from .values() rows for list endpoints
+attendance_values = ValuesSerializer(AttendanceSerializer, method_fields={
+    'employee_name': ('employee__name', str),
+    'employee_code': ('employee__employee_code', str),
+})
+
+
 class LeaveSerializer(serializers.ModelSerializer):
     employee_name = serializers.ReadOnlyField(source='employee.name')
     employee_code = serializers.ReadOnlyField(source='employee.employee_code')
@@ -33,8 +41,28 @@ class EsslPunchSerializer(serializers.ModelSerializer):
     class Meta:
         model = EsslPunch
         fields = '__all__'
+        read_only_fields = ['punch_date']
+
+essl_punch_values = ValuesSerializer(EsslPunchSerializer)
 
 class EsslConfigSerializer(serializers.ModelSerializer):
     class Meta:
         model = EsslConfig
-        fields = ['id', 'device_ip', 'device_port', 'updated_at']
+        fields = [
+            'id', 'name', 'device_ip', 'device_port', 'timeout', 'is_active', 'clear_after_ingest',
+            'last_record_count', 'last_punch_time', 'updated_at',
+        ]
+        read_only_fields = ['last_record_count', 'last_punch_time']
+
+class EsslSyncLogSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EsslSyncLog
+        fields = '__all__'
+
+class EsslSyncStateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EsslSyncState
+        fields = [
+            'status', 'message', 'records_processed', 'sync_requested_at', 'started_at', 'finished_at',
+            'last_punch_id', 'last_punch_time', 'last_synced_at', 'locked_by',
+        ]
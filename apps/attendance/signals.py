@@ -1,33 +1,33 @@
-from django.db.models.signals import post_save
+import logging
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import EsslPunch, Attendance
 from apps.employees.models import EmployeeProfile
-from collections import defaultdict
+from .models import Attendance, EsslPunch, Leave
+from .utils.attendance_sync import rebuild_attendance
+from .utils.rollups import refresh_rollups
+
+logger = logging.getLogger(__name__)
+
 
 @receiver(post_save, sender=EsslPunch)
 def sync_essl_to_attendance(sender, instance, created, **kwargs):
-    print(" Signal triggered for ESSL punch!")
-
     if not created:
         return  # Only handle new punches
 
-    emp_code = instance.employee_code
-    punch_date = instance.punch_time.date()
-    all_punches = EsslPunch.objects.filter(employee_code=emp_code, punch_time__date=punch_date)
+    # Device syncs bulk insert punches without this signal and rebuild attendance in one pass
+    if not rebuild_attendance([(instance.employee_code, instance.punch_date)]):
+        logger.warning("ESSL punch for unknown employee code %s", instance.employee_code)
+
 
-    times = [p.punch_time.time() for p in all_punches]
-    try:
-        employee = EmployeeProfile.objects.get(employee_code=emp_code)
-        Attendance.objects.update_or_create(
-            employee=employee,
-            date=punch_date,
-            defaults={
-                'in_time': min(times),
-                'out_time': max(times),
-                'is_present': True,
-                'marked_manually': False
-            }
-        )
-    except EmployeeProfile.DoesNotExist:
-        # Could log a warning if employee doesn't exist
-        pass
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=Leave)
+@receiver(post_delete, sender=Leave)
+def refresh_attendance_rollup(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, EmployeeProfile):
+        return  # The employee's rollups are deleted along with them
+    keys = {(instance.employee_id, instance.date.year, instance.date.month)}
+    previous_employee_id, previous_date = getattr(instance, '_loaded_key', (None, None))
+    if previous_date is not None:
+        keys.add((previous_employee_id, previous_date.year, previous_date.month))
+    refresh_rollups(keys)
@@ -0,0 +1,105 @@
+"""
+Background ESSL sync.
+
+SyncEsslToAttendance only records a sync request; the `essl_sync` management command
+polls the devices, ingests punches and rebuilds attendance on a schedule and on request.
+A database lock keeps a single instance active across replicas.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EsslSyncState
+from .utils.attendance_sync import sync_new_punches
+from .utils.essl_reader import fetch_essl_data
+
+logger = logging.getLogger(__name__)
+
+# Key of the PostgreSQL session-level advisory lock held by the active sync daemon
+ESSL_SYNC_LOCK_KEY = 0x45534C53
+
+
+def request_essl_sync():
+    """Ask the sync daemon to run as soon as possible and return the sync state."""
+    state = EsslSyncState.load()
+    EsslSyncState.objects.filter(pk=state.pk, sync_requested_at__isnull=True).update(
+        sync_requested_at=timezone.now()
+    )
+    state.refresh_from_db()
+    return state
+
+
+def sync_requested():
+    return EsslSyncState.objects.filter(pk=1, sync_requested_at__isnull=False).exists()
+
+
+def lock_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_sync_lock(owner):
+    """
+    Try to become the active sync daemon. PostgreSQL uses a session advisory lock,
+    released automatically if the process dies; other databases fall back to a
+    lease on the sync state row that the holder must keep renewing.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [ESSL_SYNC_LOCK_KEY])
+            return cursor.fetchone()[0]
+    EsslSyncState.load()
+    now = timezone.now()
+    return bool(
+        EsslSyncState.objects.filter(pk=1)
+        .filter(Q(locked_by=owner) | Q(lock_expires_at__isnull=True) | Q(lock_expires_at__lt=now))
+        .update(locked_by=owner, lock_expires_at=now + timedelta(seconds=settings.ESSL_SYNC_LEASE_SECONDS))
+    )
+
+
+def renew_sync_lock(owner):
+    """Extend the lease; returns False if another instance took the lock over."""
+    if connection.vendor == 'postgresql':
+        return True
+    expires_at = timezone.now() + timedelta(seconds=settings.ESSL_SYNC_LEASE_SECONDS)
+    return bool(EsslSyncState.objects.filter(pk=1, locked_by=owner).update(lock_expires_at=expires_at))
+
+
+def release_sync_lock(owner):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [ESSL_SYNC_LOCK_KEY])
+        return
+    EsslSyncState.objects.filter(pk=1, locked_by=owner).update(locked_by='', lock_expires_at=None)
+
+
+def run_essl_sync():
+    """Poll the devices, ingest their punches and rebuild attendance, recording the outcome."""
+    state = EsslSyncState.load()
+    # Clearing the request first lets one made during this run trigger the next
+    EsslSyncState.objects.filter(pk=state.pk).update(
+        sync_requested_at=None, status='running', started_at=timezone.now(), finished_at=None
+    )
+    try:
+        success, message = fetch_essl_data()
+        # Punches already stored are folded in even when a device could not be read
+        records_processed = sync_new_punches()
+    except Exception as exc:
+        logger.exception("ESSL sync failed")
+        EsslSyncState.objects.filter(pk=state.pk).update(
+            status='failed', message=str(exc), finished_at=timezone.now()
+        )
+    else:
+        EsslSyncState.objects.filter(pk=state.pk).update(
+            status='completed' if success else 'partial',
+            message=message,
+            records_processed=records_processed,
+            finished_at=timezone.now(),
+        )
+    state.refresh_from_db()
+    return state
@@ -1,3 +1,439 @@
-from django.test import TestCase
+import importlib.util
+import socket
+import socketserver
+import struct
+import threading
+import time
+from datetime import date, datetime, time as clock, timedelta
+from io import StringIO
+from itertools import count
+from unittest import skipUnless
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from apps.employees.tests import create_employee
+from payroll_system.testing import ListQueryCountMixin
+from .models import Attendance, EsslConfig, EsslPunch, EsslPunchArchive, EsslSyncLog, Leave, LeaveType
+from .serializers import AttendanceSerializer, EsslPunchSerializer, attendance_values, essl_punch_values
+from .urls import router
+from .utils.attendance_sync import archive_punches, sync_new_punches
+from .utils.essl_reader import fetch_essl_data, store_punches
 
-# Create your tests here.
+# Subset of the ZKTeco TCP protocol spoken by the zk client
+MACHINE_PREPARE_DATA_1 = 0x5050
+MACHINE_PREPARE_DATA_2 = 0x7D82
+CMD_ATTLOG_RRQ = 13
+CMD_CLEAR_ATTLOG = 15
+CMD_GET_FREE_SIZES = 50
+CMD_CONNECT = 1000
+CMD_EXIT = 1001
+CMD_ENABLEDEVICE = 1002
+CMD_DISABLEDEVICE = 1003
+CMD_DATA = 1501
+CMD_PREPARE_BUFFER = 1503
+CMD_ACK_OK = 2000
+CMD_ACK_ERROR = 2001
+
+
+def encode_time(t):
+    return (
+        ((t.year % 100) * 12 * 31 + ((t.month - 1) * 31) + t.day - 1) * (24 * 60 * 60)
+        + (t.hour * 60 + t.minute) * 60 + t.second
+    )
+
+
+class FakeZKDevice:
+    """
+    A local TCP server that answers the commands the zk client sends to read
+    the attendance log. failures drops that many connections before serving.
+    """
+
+    def __init__(self, logs=(), failures=0, delay=0):
+        self.logs = list(logs)
+        self.failures = failures
+        self.delay = delay
+        self.commands = []
+        self.connections = 0
+        device = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                device.serve(self.request)
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def config(self, **kwargs):
+        return EsslConfig.objects.create(device_ip='127.0.0.1', device_port=self.port, timeout=2, **kwargs)
+
+    def attendance_data(self):
+        records = b''.join(
+            struct.pack('<H24sB4sB8s', index + 1, user_id.encode(), 1, struct.pack('<I', encode_time(t)), 0, b'')
+            for index, (user_id, t) in enumerate(self.logs)
+        )
+        return struct.pack('<I', len(records)) + records
+
+    def reply(self, command, payload):
+        if command == CMD_GET_FREE_SIZES:
+            fields = [0] * 20
+            fields[8] = len(self.logs)
+            return CMD_ACK_OK, struct.pack('<20i', *fields)
+        if command == CMD_PREPARE_BUFFER and struct.unpack('<bhii', payload[:11])[1] == CMD_ATTLOG_RRQ:
+            return CMD_DATA, self.attendance_data()
+        if command == CMD_CLEAR_ATTLOG:
+            self.logs = []
+        if command in (CMD_CONNECT, CMD_EXIT, CMD_ENABLEDEVICE, CMD_DISABLEDEVICE, CMD_CLEAR_ATTLOG):
+            return CMD_ACK_OK, b''
+        return CMD_ACK_ERROR, b''
+
+    def serve(self, sock):
+        while True:
+            top = self.recv_exact(sock, 8)
+            if not top:
+                return
+            _, _, length = struct.unpack('<HHI', top)
+            packet = self.recv_exact(sock, length)
+            command, _, _, reply_id = struct.unpack('<4H', packet[:8])
+            if command == CMD_CONNECT:
+                self.connections += 1
+                if self.failures:
+                    self.failures -= 1
+                    return
+                time.sleep(self.delay)
+            self.commands.append(command)
+            code, data = self.reply(command, packet[8:])
+            body = struct.pack('<4H', code, 0, 1, reply_id) + data
+            sock.sendall(struct.pack('<HHI', MACHINE_PREPARE_DATA_1, MACHINE_PREPARE_DATA_2, len(body)) + body)
+            if command == CMD_EXIT:
+                return
+
+    @staticmethod
+    def recv_exact(sock, size):
+        data = b''
+        while len(data) < size:
+            try:
+                chunk = sock.recv(size - len(data))
+            except OSError:
+                return b''
+            if not chunk:
+                return b''
+            data += chunk
+        return data
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@skipUnless(importlib.util.find_spec('zk'), "zk library not installed")
+@override_settings(ESSL_POLL_RETRIES=3, ESSL_POLL_BACKOFF=0.01)
+class EsslPollingTests(TransactionTestCase):
+
+    def test_polls_all_devices_concurrently_and_merges_logs(self):
+        first_logs = [('101', datetime(2024, 11, 4, 9, 0)), ('102', datetime(2024, 11, 4, 9, 5))]
+        second_logs = [('101', datetime(2024, 11, 4, 18, 0)), ('101', datetime(2024, 11, 4, 9, 0))]
+        with FakeZKDevice(first_logs, delay=0.5) as first, FakeZKDevice(second_logs, delay=0.5) as second:
+            first.config(name='Head office')
+            second.config(name='Warehouse')
+            started = time.monotonic()
+            success, message = fetch_essl_data()
+            elapsed = time.monotonic() - started
+
+        self.assertTrue(success, message)
+        self.assertEqual(message, "Successfully fetched 3 new records.")
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(
+            sorted(EsslPunch.objects.values_list('employee_code', 'punch_time__hour')),
+            [('101', 9), ('101', 18), ('102', 9)],
+        )
+        self.assertEqual(first.commands[:3], [CMD_CONNECT, CMD_GET_FREE_SIZES, CMD_DISABLEDEVICE])
+        self.assertIn(CMD_ENABLEDEVICE, first.commands)
+
+    def test_retries_flaky_device(self):
+        with FakeZKDevice([('101', datetime(2024, 11, 4, 9, 0))], failures=2) as device:
+            device.config()
+            with self.assertLogs('apps.attendance.utils.essl_reader', 'WARNING') as logs:
+                success, message = fetch_essl_data()
+
+        self.assertTrue(success, message)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(device.connections, 3)
+        self.assertEqual(EsslPunch.objects.count(), 1)
+
+    def test_unreachable_device_does_not_block_others(self):
+        EsslConfig.objects.create(device_ip='127.0.0.1', device_port=unused_port(), timeout=1)
+        with FakeZKDevice([('101', datetime(2024, 11, 4, 9, 0))]) as device:
+            device.config()
+            EsslConfig.objects.create(device_ip='127.0.0.1', device_port=1, is_active=False)
+            with self.assertLogs('apps.attendance.utils.essl_reader', 'WARNING') as logs:
+                success, message = fetch_essl_data()
+
+        self.assertFalse(success)
+        self.assertIn("from 1 of 2 devices", message)
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(EsslPunch.objects.count(), 1)
+
+    def test_only_new_records_are_read_after_the_cursor(self):
+        with FakeZKDevice([('101', datetime(2024, 11, 4, 9, 0))]) as device:
+            config = device.config()
+            fetch_essl_data()
+            device.commands.clear()
+            success, message = fetch_essl_data()
+            self.assertEqual(message, "Successfully fetched 0 new records.")
+            # Unchanged log: counted, never downloaded, device never disabled
+            self.assertEqual(device.commands, [CMD_CONNECT, CMD_GET_FREE_SIZES, CMD_EXIT])
+
+            device.logs.append(('102', datetime(2024, 11, 4, 9, 30)))
+            success, message = fetch_essl_data()
+
+        self.assertEqual(message, "Successfully fetched 1 new records.")
+        config.refresh_from_db()
+        self.assertEqual(config.last_record_count, 2)
+        self.assertEqual(config.last_punch_time.minute, 30)
+        log = EsslSyncLog.objects.filter(device=config).latest('id')
+        self.assertEqual((log.records_transferred, log.new_records, log.cleared), (2, 1, False))
+        self.assertGreater(log.disabled_seconds, 0)
+
+    def test_log_cleared_and_refilled_on_the_device_is_read_in_full(self):
+        with FakeZKDevice([('101', datetime(2024, 11, 4, 9, 0)), ('102', datetime(2024, 11, 4, 9, 5))]) as device:
+            device.config()
+            fetch_essl_data()
+            # Cleared from the device's own menu, then refilled past the old record count
+            device.logs = [('101', datetime(2024, 11, 4, 18, hour)) for hour in (0, 5, 10)]
+            success, message = fetch_essl_data()
+
+        self.assertEqual(message, "Successfully fetched 3 new records.")
+        self.assertEqual(EsslPunch.objects.count(), 5)
+
+    def test_records_just_before_the_cursor_are_read_again(self):
+        with FakeZKDevice([('101', datetime(2024, 11, 4, 9, 0))]) as device:
+            config = device.config()
+            fetch_essl_data()
+            # Written late by the device, with a time just before the latest punch ingested
+            device.logs.append(('102', datetime(2024, 11, 4, 8, 58)))
+            success, message = fetch_essl_data()
+
+        self.assertEqual(message, "Successfully fetched 1 new records.")
+        self.assertEqual(EsslPunch.objects.count(), 2)
+        config.refresh_from_db()
+        self.assertEqual((config.last_punch_time.hour, config.last_punch_time.minute), (9, 0))
+
+    def test_clears_device_log_after_ingest(self):
+        with FakeZKDevice([('101', datetime(2024, 11, 4, 9, 0))]) as device:
+            config = device.config(clear_after_ingest=True)
+            success, message = fetch_essl_data()
+
+        self.assertTrue(success, message)
+        self.assertEqual(device.logs, [])
+        self.assertIn(CMD_CLEAR_ATTLOG, device.commands)
+        config.refresh_from_db()
+        self.assertEqual(config.last_record_count, 0)
+        self.assertTrue(EsslSyncLog.objects.get(device=config).cleared)
+        self.assertEqual(EsslPunch.objects.count(), 1)
+
+
+_sequence = count(1)
+
+
+class ListQueryCountTests(ListQueryCountMixin, TestCase):
+
+    def test_list_endpoints_run_a_bounded_number_of_queries(self):
+        self.assertListQueriesBounded(router, {
+            'attendance': lambda: Attendance.objects.create(
+                employee=create_employee(), date=date(2024, 11, 4), is_present=True
+            ),
+            'leaves': lambda: Leave.objects.create(
+                employee=create_employee(), date=date(2024, 11, 5),
+                leave_type=LeaveType.objects.create(name=f"Leave type {next(_sequence)}"),
+            ),
+            'leave-types': lambda: LeaveType.objects.create(name=f"Leave type {next(_sequence)}"),
+            'essl-punches': lambda: EsslPunch.objects.create(
+                employee_code=create_employee().employee_code,
+                punch_time=timezone.now() + timedelta(minutes=next(_sequence)),
+            ),
+            'essl-devices': lambda: EsslConfig.objects.create(name=f"Device {next(_sequence)}"),
+            'essl-sync-logs': lambda: EsslSyncLog.objects.create(
+                device=EsslConfig.objects.create(), device_address='127.0.0.1:4370'
+            ),
+        })
+
+
+class ValuesSerializerTests(TestCase):
+
+    def assertRendersLikeSerializer(self, values_serializer, serializer_class, queryset):
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(values_serializer.render(values_serializer.values(queryset))),
+            renderer.render(serializer_class(queryset, many=True).data),
+        )
+
+    def test_attendance_values_match_serializer(self):
+        employee = create_employee()
+        Attendance.objects.create(
+            employee=employee, date=date(2024, 11, 4), is_present=True,
+            in_time=datetime(2024, 11, 4, 9, 5).time(), out_time=datetime(2024, 11, 4, 18, 0).time(),
+        )
+        Attendance.objects.create(employee=employee, date=date(2024, 11, 5), marked_manually=True)
+        self.assertRendersLikeSerializer(attendance_values, AttendanceSerializer, Attendance.objects.order_by('id'))
+
+    def test_punch_values_match_serializer(self):
+        employee = create_employee()
+        for minutes in (0, 7):
+            EsslPunch.objects.create(
+                employee_code=employee.employee_code,
+                punch_time=timezone.now().replace(microsecond=250000) + timedelta(minutes=minutes),
+            )
+        self.assertRendersLikeSerializer(essl_punch_values, EsslPunchSerializer, EsslPunch.objects.order_by('id'))
+
+
+class ListFilterTests(TestCase):
+
+    def results(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['results']
+
+    def test_attendance_filters(self):
+        first, second = create_employee(), create_employee()
+        for day in (4, 5, 6):
+            Attendance.objects.create(employee=first, date=date(2024, 11, day), is_present=day != 5)
+        Attendance.objects.create(employee=second, date=date(2024, 11, 5), is_present=True)
+
+        rows = self.results('/api/attendance/attendance/', employee=first.id, date_from='2024-11-05')
+        self.assertEqual(sorted(row['date'] for row in rows), ['2024-11-05', '2024-11-06'])
+        rows = self.results('/api/attendance/attendance/', date_to='2024-11-05', is_present='true')
+        self.assertEqual(sorted((row['employee'], row['date']) for row in rows), [
+            (first.id, '2024-11-04'), (second.id, '2024-11-05'),
+        ])
+
+    def test_leave_and_punch_filters(self):
+        employee = create_employee()
+        leave_type = LeaveType.objects.create(name="Sick")
+        Leave.objects.create(employee=employee, date=date(2024, 11, 4), leave_type=leave_type, status='approved')
+        Leave.objects.create(employee=employee, date=date(2024, 11, 8), leave_type=leave_type)
+        for hour in (8, 12, 17):
+            EsslPunch.objects.create(
+                employee_code=employee.employee_code, punch_time=timezone.make_aware(datetime(2024, 11, 4, hour))
+            )
+
+        rows = self.results('/api/attendance/leaves/', status='pending', date_from='2024-11-01', date_to='2024-11-30')
+        self.assertEqual([row['date'] for row in rows], ['2024-11-08'])
+        rows = self.results(
+            '/api/attendance/essl-punches/', employee_code=employee.employee_code,
+            time_from='2024-11-04T10:00:00Z', time_to='2024-11-04T17:00:00Z',
+        )
+        self.assertEqual(sorted(row['punch_time'] for row in rows), ['2024-11-04T12:00:00Z', '2024-11-04T17:00:00Z'])
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get('/api/attendance/attendance/', {'date_from': '2024-13-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date_from', response.json())
+
+    def test_report_filters(self):
+        first, second = create_employee(), create_employee()
+        second.status = 'resigned'
+        second.save()
+
+        response = self.client.get('/api/attendance/reports/attendance/', {
+            'year': 2024, 'month': 11, 'department': first.department_id,
+        })
+        self.assertEqual([row['employee_id'] for row in response.json()], [first.id])
+        response = self.client.get('/api/attendance/reports/attendance/', {'year': 2024, 'month': 11, 'status': 'resigned'})
+        self.assertEqual([row['employee_id'] for row in response.json()], [second.id])
+
+    def test_invalid_report_filter_is_rejected(self):
+        for url in ('/api/attendance/reports/attendance/', '/api/attendance/reports/attendance.pdf',
+                    '/api/attendance/reports/attendance.xlsx'):
+            for param, value in (('department', 'abc'), ('category', 'manager'), ('status', 'retired')):
+                with self.subTest(url, param=param):
+                    response = self.client.get(url, {'year': 2024, 'month': 11, param: value})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(param, response.json())
+
+    def test_attendance_by_date_department_filter(self):
+        create_employee()  # in another department
+        employee = create_employee()
+        Attendance.objects.create(employee=employee, date=date(2024, 11, 4), is_present=True)
+
+        response = self.client.get('/api/attendance/attendance-by-date/', {
+            'date': '2024-11-04', 'department': employee.department_id,
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row['employee_id'] for row in response.json()], [employee.id])
+        self.assertTrue(response.json()[0]['attendance']['is_present'])
+
+        response = self.client.get('/api/attendance/attendance-by-date/', {'date': '2024-11-04', 'department': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('department', response.json())
+
+
+class PunchArchiveTests(TestCase):
+
+    def setUp(self):
+        self.employee = create_employee()
+        self.code = self.employee.employee_code
+
+    def punch(self, day, hour, minute=0):
+        return datetime(2024, 10, day, hour, minute)
+
+    def store(self, *punch_times):
+        store_punches((self.code, punch_time) for punch_time in punch_times)
+        sync_new_punches()
+
+    def archived_times(self, day):
+        archive = EsslPunchArchive.objects.get(employee_code=self.code, punch_date=date(2024, 10, day))
+        return [datetime.fromisoformat(punch_time).replace(tzinfo=None) for punch_time in archive.punch_times]
+
+    def test_only_synced_punches_before_the_window_are_archived(self):
+        self.store(self.punch(1, 9), self.punch(1, 18))
+        recent = timezone.now().replace(microsecond=0)
+        self.store(recent)
+        # Stored but not yet folded into Attendance by a sync
+        store_punches([(self.code, self.punch(2, 9))])
+
+        out = StringIO()
+        call_command('archive_essl_punches', months=12, stdout=out)
+
+        self.assertIn("Archived 2 punches", out.getvalue())
+        self.assertEqual(self.archived_times(1), [self.punch(1, 9), self.punch(1, 18)])
+        self.assertEqual(
+            sorted(EsslPunch.objects.values_list('punch_time', flat=True)),
+            [timezone.make_aware(self.punch(2, 9)), recent],
+        )
+
+    def test_day_split_across_batches_is_merged_into_one_row(self):
+        self.store(self.punch(1, 9), self.punch(1, 13), self.punch(1, 18), self.punch(2, 9))
+
+        self.assertEqual(archive_punches(date(2024, 11, 1), batch_size=2), 4)
+        self.assertEqual(EsslPunchArchive.objects.count(), 2)
+        self.assertEqual(self.archived_times(1), [self.punch(1, 9), self.punch(1, 13), self.punch(1, 18)])
+        self.assertFalse(EsslPunch.objects.exists())
+
+    def test_archived_punches_are_not_stored_again(self):
+        self.store(self.punch(1, 9), self.punch(1, 18))
+        archive_punches(date(2024, 11, 1))
+
+        # A device still holding the old log hands the same records back
+        self.assertEqual(store_punches([(self.code, self.punch(1, 9)), (self.code, self.punch(1, 18))]), 0)
+        self.assertFalse(EsslPunch.objects.exists())
+
+    def test_late_punch_is_combined_with_the_archived_day(self):
+        self.store(self.punch(1, 9), self.punch(1, 12))
+        archive_punches(date(2024, 11, 1))
+
+        self.store(self.punch(1, 18, 30))
+        attendance = Attendance.objects.get(employee=self.employee, date=date(2024, 10, 1))
+        self.assertEqual((attendance.in_time, attendance.out_time), (clock(9), clock(18, 30)))
@@ -9,6 +9,8 @@ from .views import (
     AttendanceByDate,
     MarkAttendanceManually,
     EsslConfigView,
+    EsslDeviceViewSet,
+    EsslSyncLogViewSet,
     AttendanceMonthlyReportAPIView,
     AttendanceMonthlyReportPDFAPIView,
     AttendanceMonthlyReportExcelAPIView
@@ -20,6 +22,8 @@ router.register(r'attendance', AttendanceViewSet)
 router.register(r'leaves', LeaveViewSet)
 router.register(r'leave-types', LeaveTypeViewSet)
 router.register(r'essl-punches', EsslPunchViewSet)
+router.register(r'essl-devices', EsslDeviceViewSet)
+router.register(r'essl-sync-logs', EsslSyncLogViewSet)
 
 urlpatterns = [
     path('sync-essl/', SyncEsslToAttendance.as_view(), name='sync_essl'),
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.attendance.models import Attendance, EsslPunch, EsslPunchArchive, EsslSyncState, local_punch_time
+from apps.employees.models import EmployeeProfile
+from apps.attendance.utils.rollups import refresh_rollups
+
+ATTENDANCE_BATCH_SIZE = 1000
+
+
+def archived_punches(first_day, last_day, codes=None):
+    """Yield (employee_code, punch_date, punch_times) from the archive for a range of days."""
+    archive = EsslPunchArchive.objects.filter(punch_date__range=(first_day, last_day))
+    if codes is not None:
+        archive = archive.filter(employee_code__in=codes)
+    for code, day, punch_times in archive.values_list('employee_code', 'punch_date', 'punch_times'):
+        yield code, day, [parse_datetime(punch_time) for punch_time in punch_times]
+
+
+def rebuild_attendance(groups):
+    """
+    Recompute Attendance in/out times for the given (employee_code, date) groups
+    from every punch stored for them, and upsert the rows in bulk.
+    Returns the number of attendance rows written.
+    """
+    groups = set(groups)
+    if not groups:
+        return 0
+
+    codes = {code for code, _ in groups}
+    employee_ids = dict(
+        EmployeeProfile.objects.filter(employee_code__in=codes).values_list('employee_code', 'id')
+    )
+    groups = {(code, day) for code, day in groups if code in employee_ids}
+    if not groups:
+        return 0
+
+    # One indexed scan over the affected days, then keep only the requested groups
+    first_day = min(day for _, day in groups)
+    last_day = max(day for _, day in groups)
+    codes = {code for code, _ in groups}
+    punches = EsslPunch.objects.filter(
+        employee_code__in=codes, punch_date__range=(first_day, last_day)
+    ).values_list('employee_code', 'punch_date', 'punch_time')
+
+    times = defaultdict(list)
+    for code, day, punch_time in punches:
+        if (code, day) in groups:
+            times[(code, day)].append(local_punch_time(punch_time).time())
+    # Late punches for days already archived are combined with the archived ones
+    for code, day, punch_times in archived_punches(first_day, last_day, codes):
+        if (code, day) in times:
+            times[(code, day)].extend(local_punch_time(punch_time).time() for punch_time in punch_times)
+
+    rows = [
+        Attendance(
+            employee_id=employee_ids[code],
+            date=day,
+            in_time=min(punch_times),
+            out_time=max(punch_times),
+            is_present=True,
+            marked_manually=False,
+        )
+        for (code, day), punch_times in times.items()
+    ]
+    Attendance.objects.bulk_create(
+        rows,
+        batch_size=ATTENDANCE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['employee', 'date'],
+        update_fields=['in_time', 'out_time', 'is_present', 'marked_manually', 'updated_at'],
+    )
+
+    # bulk_create skips the signals that normally refresh the rollups and flag the month's salary as stale
+    from apps.salary.utils import mark_months_dirty
+    months = {(row.employee_id, row.date.year, row.date.month) for row in rows}
+    refresh_rollups(months)
+    mark_months_dirty(months)
+    return len(rows)
+
+
+def sync_new_punches():
+    """
+    Fold punches stored since the last sync into Attendance.
+    Only the (employee_code, date) groups that received new punches are rebuilt.
+    Returns the number of attendance rows written.
+    """
+    with transaction.atomic():
+        EsslSyncState.load()
+        state = EsslSyncState.objects.select_for_update().get(pk=1)
+        new_punches = EsslPunch.objects.filter(id__gt=state.last_punch_id).values_list(
+            'id', 'employee_code', 'punch_date', 'punch_time'
+        )
+
+        groups = set()
+        last_id, last_time = state.last_punch_id, state.last_punch_time
+        for punch_id, code, punch_date, punch_time in new_punches.iterator():
+            groups.add((code, punch_date))
+            if punch_id > last_id:
+                last_id, last_time = punch_id, punch_time
+
+        updated_count = rebuild_attendance(groups)
+
+        state.last_punch_id = last_id
+        state.last_punch_time = last_time
+        state.last_synced_at = timezone.now()
+        state.save(update_fields=['last_punch_id', 'last_punch_time', 'last_synced_at'])
+    return updated_count
+
+
+def archive_punches(before, batch_size=5000):
+    """
+    Move punches dated before `before` into EsslPunchArchive, one row per employee and day.
+    Only punches already folded into Attendance are moved. Returns the number of punches archived.
+    """
+    last_punch_id = EsslSyncState.load().last_punch_id
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                EsslPunch.objects.filter(punch_date__lt=before, id__lte=last_punch_id)
+                .order_by('id')
+                .values_list('id', 'employee_code', 'punch_date', 'punch_time')[:batch_size]
+            )
+            if not rows:
+                return archived
+
+            times = defaultdict(set)
+            for _, code, day, punch_time in rows:
+                times[(code, day)].add(punch_time)
+            days = [day for _, day in times]
+            codes = {code for code, _ in times}
+            # A day split across batches, or archived before, is merged into its existing row
+            for code, day, punch_times in archived_punches(min(days), max(days), codes):
+                if (code, day) in times:
+                    times[(code, day)].update(punch_times)
+
+            EsslPunchArchive.objects.bulk_create(
+                [
+                    EsslPunchArchive(employee_code=code, punch_date=day, punch_times=sorted(punch_times))
+                    for (code, day), punch_times in times.items()
+                ],
+                batch_size=ATTENDANCE_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['employee_code', 'punch_date'],
+                update_fields=['punch_times'],
+            )
+            EsslPunch.objects.filter(id__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
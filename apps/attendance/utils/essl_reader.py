@@ -1,45 +1,248 @@
-from datetime import datetime
-from apps.attendance.models import EsslPunch, EsslConfig
-from apps.employees.models import EmployeeProfile
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from apps.attendance.models import EsslPunch, EsslConfig, EsslSyncLog, local_punch_time
+from apps.attendance.utils.attendance_sync import archived_punches
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
-def fetch_essl_data():
+logger = logging.getLogger(__name__)
+
+PUNCH_BATCH_SIZE = 1000
+# Records this close before a device's cursor are read again, and deduplicated on insert
+CURSOR_OVERLAP = timedelta(minutes=5)
+
+
+def aware_punch_time(punch_time):
+    # Device clocks have no zone; read them in the configured TIME_ZONE
+    return timezone.make_aware(punch_time) if timezone.is_naive(punch_time) else punch_time
+
+
+def store_punches(logs):
     """
-    Connects to the ESSL device, fetches attendance logs, and saves them to the database.
-    Returns a tuple (success, message).
+    Insert (employee_code, punch_time) device logs that are not stored yet.
+    Existing keys for the logs' time window are loaded in one query and the
+    rest are bulk inserted; Attendance is rebuilt afterwards by sync_new_punches.
+    Returns the number of new punches.
     """
+    keys = set()
+    for user_id, punch_time in logs:
+        keys.add((str(user_id), aware_punch_time(punch_time)))
+    if not keys:
+        return 0
+
+    times = [punch_time for _, punch_time in keys]
+    first_day = local_punch_time(min(times)).date()
+    last_day = local_punch_time(max(times)).date()
+    existing = set(
+        EsslPunch.objects.filter(punch_date__range=(first_day, last_day), punch_time__range=(min(times), max(times)))
+        .values_list('employee_code', 'punch_time')
+    )
+    # Punches already moved to the archive must not come back into the hot table
+    for code, _, punch_times in archived_punches(first_day, last_day):
+        existing.update((code, punch_time) for punch_time in punch_times)
+    new_punches = [
+        EsslPunch(employee_code=code, punch_time=punch_time, punch_date=local_punch_time(punch_time).date())
+        for code, punch_time in sorted(keys - existing, key=lambda key: key[1])
+    ]
+    # The unique constraint covers punches stored concurrently since the preload
+    EsslPunch.objects.bulk_create(new_punches, batch_size=PUNCH_BATCH_SIZE, ignore_conflicts=True)
+    return len(new_punches)
+
+
+def _connect(device):
+    from zk import ZK  # lazy import to avoid startup crash if not installed
+
+    return ZK(device.device_ip, port=device.device_port, timeout=device.timeout, ommit_ping=True).connect()
+
+
+def _disconnect(conn, device):
     try:
-        from zk import ZK, const  # lazy import to avoid startup crash if not installed
-    except Exception:
-        return False, "zk library not installed; cannot connect to device"
-    cfg = EsslConfig.objects.first()
-    device_ip = cfg.device_ip if cfg else getattr(settings, 'ESSL_DEVICE_IP', '192.168.1.201')
-    device_port = cfg.device_port if cfg else getattr(settings, 'ESSL_DEVICE_PORT', 4370)
-    
-    zk = ZK(device_ip, port=device_port, timeout=5)
-    
+        conn.disconnect()
+    except Exception as e:
+        logger.debug("ESSL device %s:%s disconnect failed: %s", device.device_ip, device.device_port, e)
+
+
+def read_device(device):
+    """
+    Read the records punched on one device since its cursor, the latest punch
+    time already ingested. Records within CURSOR_OVERLAP of it are read again
+    (store_punches skips the ones already stored), so a record written late or
+    on a drifting clock is not lost. An unchanged record count means nothing was
+    added, and the log is not downloaded; the device is only disabled for the
+    download itself. Returns (logs, metrics).
+    """
+    conn = _connect(device)
     try:
-        conn = zk.connect()
+        conn.read_sizes()
+        metrics = {
+            'records_on_device': conn.records, 'records_transferred': 0, 'new_records': 0, 'disabled_seconds': 0.0,
+        }
+        if conn.records == device.last_record_count:
+            return [], metrics
+
+        disabled_at = time.monotonic()
         conn.disable_device()
-        
-        count = 0
         try:
-            attendance_records = conn.get_attendance()
-            for att in attendance_records:
-                punch_time = att.timestamp
-                user_id = att.user_id
-
-                # Save to EsslPunch model if not exists
-                if not EsslPunch.objects.filter(employee_code=user_id, punch_time=punch_time).exists():
-                    EsslPunch.objects.create(employee_code=user_id, punch_time=punch_time)
-                    count += 1
-        except Exception as e:
-            return False, f"Error processing records: {str(e)}"
+            records = conn.get_attendance()
+        finally:
+            conn.enable_device()
+            metrics['disabled_seconds'] = time.monotonic() - disabled_at
+        metrics['records_on_device'] = metrics['records_transferred'] = len(records)
+        logs = [(att.user_id, aware_punch_time(att.timestamp)) for att in records]
+        cursor = device.last_punch_time
+        if cursor:
+            logs = [log for log in logs if log[1] > cursor - CURSOR_OVERLAP]
+        metrics['new_records'] = sum(1 for _, punch_time in logs if not cursor or punch_time > cursor)
+        return logs, metrics
+    finally:
+        _disconnect(conn, device)
+
+
+def clear_device(device, expected_records):
+    """
+    Clear the device log once its records are stored, unless punches arrived
+    since it was read; those are left for the next sync to ingest and clear.
+    Returns (cleared, disabled_seconds).
+    """
+    conn = _connect(device)
+    try:
+        disabled_at = time.monotonic()
+        conn.disable_device()
+        try:
+            conn.read_sizes()
+            cleared = conn.records == expected_records
+            if cleared:
+                conn.clear_attendance()
         finally:
             conn.enable_device()
-            conn.disconnect()
-            
-        return True, f"Successfully fetched {count} new records."
-        
+        return cleared, time.monotonic() - disabled_at
+    finally:
+        _disconnect(conn, device)
+
+
+def poll_device(device, retries, backoff):
+    """
+    Read one device, retrying failed attempts with exponential backoff.
+    Returns a dict with the device label, its new logs, transfer metrics and the last error, if any.
+    """
+    result = {
+        'device': f"{device.device_ip}:{device.device_port}", 'logs': [], 'error': None, 'attempts': 0,
+        'records_on_device': 0, 'records_transferred': 0, 'new_records': 0, 'disabled_seconds': 0.0,
+        'cleared': False,
+    }
+    started = time.monotonic()
+    for attempt in range(max(retries, 1)):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        result['attempts'] = attempt + 1
+        try:
+            result['logs'], metrics = read_device(device)
+            result.update(metrics, error=None)
+            break
+        except Exception as e:
+            logger.warning("ESSL device %s attempt %s failed: %s", result['device'], attempt + 1, e)
+            result['error'] = str(e)
+    result['duration_seconds'] = time.monotonic() - started
+    return result
+
+
+def _clear_after_ingest(device, result):
+    try:
+        cleared, disabled_seconds = clear_device(device, result['records_on_device'])
     except Exception as e:
-        return False, f"Could not connect to ESSL device at {device_ip}:{device_port}. Error: {str(e)}"
+        logger.warning("ESSL device %s could not be cleared: %s", result['device'], e)
+        return
+    result['cleared'] = cleared
+    result['disabled_seconds'] += disabled_seconds
+
+
+def configured_devices():
+    devices = list(EsslConfig.objects.filter(is_active=True).order_by('id'))
+    if not devices and not EsslConfig.objects.exists():
+        devices = [EsslConfig(
+            device_ip=getattr(settings, 'ESSL_DEVICE_IP', '192.168.1.201'),
+            device_port=getattr(settings, 'ESSL_DEVICE_PORT', 4370),
+        )]
+    return devices
+
+
+def poll_devices(devices):
+    """
+    Read all devices concurrently and ingest their logs in one pass.
+    Only device I/O runs in the pool threads; the database is touched from the caller.
+    Device cursors advance, and opted-in device logs are cleared, only after the
+    punches are committed. Returns (results, new_count).
+    """
+    if not devices:
+        return [], 0
+    retries = getattr(settings, 'ESSL_POLL_RETRIES', 3)
+    backoff = getattr(settings, 'ESSL_POLL_BACKOFF', 1.0)
+    workers = min(len(devices), getattr(settings, 'ESSL_POLL_WORKERS', 8))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda device: poll_device(device, retries, backoff), devices))
+        with transaction.atomic():
+            new_count = store_punches(log for result in results for log in result['logs'])
+
+        to_clear = [
+            (device, result) for device, result in zip(devices, results)
+            if device.clear_after_ingest and not result['error'] and result['records_on_device']
+        ]
+        list(pool.map(lambda pair: _clear_after_ingest(*pair), to_clear))
+
+    for device, result in zip(devices, results):
+        if not device.pk:
+            continue
+        if not result['error']:
+            device.last_record_count = 0 if result['cleared'] else result['records_on_device']
+            if result['logs']:
+                latest = max(punch_time for _, punch_time in result['logs'])
+                device.last_punch_time = max(latest, device.last_punch_time or latest)
+            device.save(update_fields=['last_record_count', 'last_punch_time'])
+    EsslSyncLog.objects.bulk_create([
+        EsslSyncLog(
+            device=device if device.pk else None,
+            device_address=result['device'],
+            duration_seconds=result['duration_seconds'],
+            attempts=result['attempts'],
+            records_on_device=result['records_on_device'],
+            records_transferred=result['records_transferred'],
+            new_records=result['new_records'],
+            disabled_seconds=result['disabled_seconds'],
+            cleared=result['cleared'],
+            error=result['error'] or '',
+        )
+        for device, result in zip(devices, results)
+    ])
+    return results, new_count
+
+
+def fetch_essl_data():
+    """
+    Connects to every active ESSL device, fetches attendance logs, and saves them to the database.
+    Returns a tuple (success, message); success is False if any device could not be read.
+    """
+    try:
+        import zk  # noqa: F401
+    except Exception:
+        return False, "zk library not installed; cannot connect to device"
+
+    devices = configured_devices()
+    if not devices:
+        return False, "No active ESSL devices configured."
+    try:
+        results, count = poll_devices(devices)
+    except Exception as e:
+        return False, f"Error processing records: {str(e)}"
+
+    failed = [result for result in results if result['error']]
+    message = f"Successfully fetched {count} new records."
+    if failed:
+        errors = "; ".join(f"{result['device']}: {result['error']}" for result in failed)
+        message = (
+            f"Fetched {count} new records from {len(results) - len(failed)} of {len(results)} devices. "
+            f"Could not connect to ESSL device(s) {errors}"
+        )
+    return not failed, message
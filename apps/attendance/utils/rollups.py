@@ -0,0 +1,110 @@
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, datetime
+from django.db import transaction
+from apps.attendance.models import Attendance, AttendanceMonthlyRollup, Leave
+
+ROLLUP_BATCH_SIZE = 1000
+
+
+def sunday_count(year, month):
+    return sum(1 for day in range(1, monthrange(year, month)[1] + 1) if date(year, month, day).weekday() == 6)
+
+
+def worked_minutes(in_time, out_time):
+    if not in_time or not out_time or out_time <= in_time:
+        return 0
+    delta = datetime.combine(date.min, out_time) - datetime.combine(date.min, in_time)
+    return int(delta.total_seconds() // 60)
+
+
+def rollup_values(attendance_rows, leave_days, year, month):
+    """
+    Build the rollup fields of one employee-month.
+    attendance_rows: (date, is_present, in_time, out_time); leave_days: dates of approved leaves.
+    """
+    present_mask = recorded_mask = leave_mask = minutes = 0
+    for day, is_present, in_time, out_time in attendance_rows:
+        recorded_mask |= 1 << day.day
+        if is_present:
+            present_mask |= 1 << day.day
+            minutes += worked_minutes(in_time, out_time)
+    for day in leave_days:
+        leave_mask |= 1 << day.day
+    return {
+        'present_mask': present_mask,
+        'recorded_mask': recorded_mask,
+        'leave_mask': leave_mask,
+        'present_days': present_mask.bit_count(),
+        'absent_days': (recorded_mask & ~present_mask).bit_count(),
+        'approved_leaves': leave_mask.bit_count(),
+        'sundays': sunday_count(year, month),
+        'worked_minutes': minutes,
+    }
+
+
+def refresh_rollups(keys):
+    """
+    Recompute the AttendanceMonthlyRollup rows of the given (employee_id, year, month) keys
+    from their Attendance and approved Leave rows, with one query per source and month.
+    Rows left without any attendance or leave are deleted.
+    """
+    employees_by_month = defaultdict(set)
+    for employee_id, year, month in keys:
+        employees_by_month[(year, month)].add(employee_id)
+
+    with transaction.atomic():
+        for (year, month), employee_ids in employees_by_month.items():
+            _refresh_month(year, month, employee_ids)
+
+
+def rebuild_rollups(year, month):
+    """Recompute the rollups of every employee with attendance or leaves in the month."""
+    month_dates = (date(year, month, 1), date(year, month, monthrange(year, month)[1]))
+    employee_ids = set(
+        Attendance.objects.filter(date__range=month_dates).values_list('employee_id', flat=True)
+    ) | set(
+        Leave.objects.filter(date__range=month_dates, status='approved').values_list('employee_id', flat=True)
+    )
+    with transaction.atomic():
+        AttendanceMonthlyRollup.objects.filter(year=year, month=month).exclude(employee_id__in=employee_ids).delete()
+        _refresh_month(year, month, employee_ids)
+
+
+def _refresh_month(year, month, employee_ids):
+    start_date = date(year, month, 1)
+    end_date = date(year, month, monthrange(year, month)[1])
+
+    attendance = defaultdict(list)
+    for employee_id, *row in Attendance.objects.filter(
+        employee_id__in=employee_ids, date__range=(start_date, end_date)
+    ).values_list('employee_id', 'date', 'is_present', 'in_time', 'out_time'):
+        attendance[employee_id].append(row)
+
+    leaves = defaultdict(list)
+    for employee_id, day in Leave.objects.filter(
+        employee_id__in=employee_ids, date__range=(start_date, end_date), status='approved'
+    ).values_list('employee_id', 'date'):
+        leaves[employee_id].append(day)
+
+    rollups = [
+        AttendanceMonthlyRollup(
+            employee_id=employee_id, year=year, month=month,
+            **rollup_values(attendance[employee_id], leaves[employee_id], year, month),
+        )
+        for employee_id in employee_ids
+        if attendance[employee_id] or leaves[employee_id]
+    ]
+    empty = [employee_id for employee_id in employee_ids if not attendance[employee_id] and not leaves[employee_id]]
+    if empty:
+        AttendanceMonthlyRollup.objects.filter(employee_id__in=empty, year=year, month=month).delete()
+    AttendanceMonthlyRollup.objects.bulk_create(
+        rollups,
+        batch_size=ROLLUP_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['employee', 'year', 'month'],
+        update_fields=[
+            'present_mask', 'recorded_mask', 'leave_mask', 'present_days', 'absent_days',
+            'approved_leaves', 'sundays', 'worked_minutes', 'updated_at',
+        ],
+    )
@@ -1,22 +1,49 @@
 from rest_framework import viewsets
 from rest_framework.views import APIView
-from .models import Attendance, Leave, LeaveType, EsslPunch, EsslConfig
+from .models import Attendance, AttendanceMonthlyRollup, Leave, LeaveType, EsslPunch, EsslConfig, EsslSyncLog, EsslSyncState
 from apps.employees.models import EmployeeProfile  
 from rest_framework.response import Response
 from datetime import date, datetime
 from rest_framework import status
 from .serializers import *
-from collections import defaultdict
 from django.http import HttpResponse
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from payroll_system.filters import (
+    boolean_param, choice_param, date_param, datetime_param, integer_param, parse_query_filters,
+)
+from payroll_system.pagination import KeysetPagination, StandardPagination, wants_pagination
+from payroll_system.report_cache import cached_report
+from payroll_system.values_serializers import ValuesListMixin
 import io
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
+    values_serializer = attendance_values
+    query_filters = {
+        'employee': ('employee_id', integer_param),
+        'date_from': ('date__gte', date_param),
+        'date_to': ('date__lte', date_param),
+        'is_present': ('is_present', boolean_param),
+    }
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('employee')
 
 class LeaveViewSet(viewsets.ModelViewSet):
     queryset = Leave.objects.all().order_by('-created_at')
     serializer_class = LeaveSerializer
+    pagination_class = KeysetPagination
+    query_filters = {
+        'status': ('status', choice_param(Leave.STATUS_CHOICES)),
+        'date_from': ('date__gte', date_param),
+        'date_to': ('date__lte', date_param),
+    }
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('employee', 'leave_type')
     
     def perform_update(self, serializer):
         leave = serializer.save()
@@ -36,51 +63,31 @@ class LeaveTypeViewSet(viewsets.ModelViewSet):
     queryset = LeaveType.objects.all()
     serializer_class = LeaveTypeSerializer
 
-class EsslPunchViewSet(viewsets.ModelViewSet):
+class EsslPunchViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = EsslPunch.objects.all()
     serializer_class = EsslPunchSerializer
+    values_serializer = essl_punch_values
+    query_filters = {
+        'employee_code': ('employee_code', str),
+        'time_from': ('punch_time__gte', datetime_param),
+        'time_to': ('punch_time__lte', datetime_param),
+    }
+    pagination_class = KeysetPagination
 
-from .utils.essl_reader import fetch_essl_data
+from .tasks import request_essl_sync
 
 class SyncEsslToAttendance(APIView):
+    """
+    Device I/O runs in the `essl_sync` background command; POST only requests
+    a sync and GET reports the state of the last one.
+    """
+    def get(self, request):
+        return Response(EsslSyncStateSerializer(EsslSyncState.load()).data)
+
     def post(self, request):
-        # First, try to fetch new data from the device
-        success, message = fetch_essl_data()
-        
-        # Even if fetching fails (e.g., device offline), we process existing logs
-        # but we should warn the user.
-        
-        punch_map = defaultdict(list)
-        for punch in EsslPunch.objects.all():
-            punch_date = punch.punch_time.date()
-            punch_map[(punch.employee_code, punch_date)].append(punch.punch_time.time())
-
-        updated_count = 0
-        for (emp_code, punch_date), times in punch_map.items():
-            try:
-                employee = EmployeeProfile.objects.get(employee_code=emp_code)
-                Attendance.objects.update_or_create(
-                    employee=employee,
-                    date=punch_date,
-                    defaults={
-                        'in_time': min(times),
-                        'out_time': max(times),
-                        'is_present': True,
-                        'marked_manually': False
-                    }
-                )
-                updated_count += 1
-            except EmployeeProfile.DoesNotExist:
-                continue
-
-        response_data = {
-            'detail': 'ESSL synced to attendance.',
-            'device_status': message,
-            'records_processed': updated_count
-        }
-        
-        status_code = status.HTTP_200_OK if success else status.HTTP_207_MULTI_STATUS
-        return Response(response_data, status=status_code)
+        state = request_essl_sync()
+        response_data = {'detail': 'ESSL sync requested.', **EsslSyncStateSerializer(state).data}
+        return Response(response_data, status=status.HTTP_202_ACCEPTED)
 
 class EsslConfigView(APIView):
     def get(self, request):
@@ -100,6 +107,18 @@ class EsslConfigView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class EsslDeviceViewSet(viewsets.ModelViewSet):
+    queryset = EsslConfig.objects.order_by('id')
+    serializer_class = EsslConfigSerializer
+
+class EsslSyncLogViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = EsslSyncLog.objects.order_by('-started_at')
+    serializer_class = EsslSyncLogSerializer
+    pagination_class = KeysetPagination
+
+ROSTER_FILTERS = {'department': ('department_id', integer_param)}
+
+
 class AttendanceByDate(APIView):
     def get(self, request):
         date_str = request.query_params.get("date")
@@ -111,18 +130,35 @@ class AttendanceByDate(APIView):
         except ValueError:
             return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
 
-        employees = EmployeeProfile.objects.filter(date_of_joining__lte=date_obj)
+        roster = EmployeeProfile.objects.filter(
+            date_of_joining__lte=date_obj, **parse_query_filters(request, ROSTER_FILTERS)
+        ).order_by('id')
+
+        # Two queries, no model instances: the roster and the day's attendance of its employees
+        employees = roster.values('id', 'name', 'employee_code')
+        day_attendance = Attendance.objects.filter(date=date_obj)
+        paginator = StandardPagination() if wants_pagination(request) else None
+        if paginator:
+            employees = paginator.paginate_queryset(employees, request, view=self)
+            day_attendance = day_attendance.filter(employee_id__in=[emp['id'] for emp in employees])
+        else:
+            day_attendance = day_attendance.filter(employee__in=roster)
+        serialized = {
+            attendance['employee']: attendance
+            for attendance in attendance_values.render(attendance_values.values(day_attendance))
+        }
 
         response_data = []
         for emp in employees:
-            attendance = Attendance.objects.filter(employee=emp, date=date_obj).first()
             response_data.append({
-                "employee_id": emp.id,
-                "employee_name": f"{emp.name}",
-                "employee_code": emp.employee_code,
-                "attendance": AttendanceSerializer(attendance).data if attendance else None
+                "employee_id": emp['id'],
+                "employee_name": f"{emp['name']}",
+                "employee_code": emp['employee_code'],
+                "attendance": serialized.get(emp['id'])
             })
 
+        if paginator:
+            return paginator.get_paginated_response(response_data)
         return Response(response_data)
 
 class MarkAttendanceManually(APIView):
@@ -160,7 +196,7 @@ class MarkAttendanceManually(APIView):
 
         attendance, created = Attendance.objects.update_or_create(
             employee=employee,
-            date=attendance_date,
+            date=attendance_date_obj,
             defaults={
                 "in_time": in_time,
                 "out_time": out_time,
@@ -172,31 +208,76 @@ class MarkAttendanceManually(APIView):
         serializer = AttendanceSerializer(attendance)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
+ATTENDANCE_REPORT_FILTERS = {
+    'department': ('department_id', integer_param),
+    'category': ('category', choice_param(EmployeeProfile.CATEGORY_CHOICES)),
+    'status': ('status', choice_param(EmployeeProfile.STATUS_CHOICES)),
+}
+
+
+def attendance_report_filters(request):
+    return parse_query_filters(request, ATTENDANCE_REPORT_FILTERS)
+
+
+def attendance_report_queryset(year, month, filters=None):
+    """
+    Employees with their present/absent day counts for a month, in one query.
+    Counts come from the monthly attendance rollups through conditional aggregation;
+    employees without attendance that month get zeros.
+    filters: optional department_id, category and status lookups on the employees.
+    """
+    in_month = Q(attendance_rollups__year=year, attendance_rollups__month=month)
+    return (
+        EmployeeProfile.objects.filter(**(filters or {}))
+        .annotate(
+            present_days=Coalesce(Sum('attendance_rollups__present_days', filter=in_month), 0),
+            absent_days=Coalesce(Sum('attendance_rollups__absent_days', filter=in_month), 0),
+        )
+        .order_by('id')
+        .values('id', 'name', 'employee_code', 'present_days', 'absent_days')
+    )
+
+
 class AttendanceMonthlyReportAPIView(APIView):
     def get(self, request):
         year = int(request.query_params.get("year"))
         month = int(request.query_params.get("month"))
-        employees = EmployeeProfile.objects.all()
-        data = []
-        for emp in employees:
-            qs = Attendance.objects.filter(employee=emp, date__year=year, date__month=month)
-            present_days = qs.filter(is_present=True).count()
-            total_days = qs.count()
-            absent_days = max(0, total_days - present_days)
-            data.append({
-                "employee_id": emp.id,
-                "employee_name": emp.name,
-                "employee_code": emp.employee_code,
-                "present_days": present_days,
-                "absent_days": absent_days,
-                "month": month,
-                "year": year,
-            })
+        rows = attendance_report_queryset(year, month, attendance_report_filters(request))
+        paginator = StandardPagination() if wants_pagination(request) else None
+        if paginator:
+            rows = paginator.paginate_queryset(rows, request, view=self)
+        data = [{
+            "employee_id": row["id"],
+            "employee_name": row["name"],
+            "employee_code": row["employee_code"],
+            "present_days": row["present_days"],
+            "absent_days": row["absent_days"],
+            "month": month,
+            "year": year,
+        } for row in rows]
+        if paginator:
+            return paginator.get_paginated_response(data)
         return Response(data)
 
 
+def attendance_report_sources(year, month):
+    return [
+        (AttendanceMonthlyRollup.objects.filter(year=year, month=month), ['updated_at']),
+        (EmployeeProfile.objects.all(), ['created_at', 'updated_at']),
+    ]
+
+
 class AttendanceMonthlyReportPDFAPIView(APIView):
     def get(self, request):
+        year = int(request.query_params.get("year"))
+        month = int(request.query_params.get("month"))
+        filters = attendance_report_filters(request)
+        return cached_report(
+            request, 'attendance_report.pdf', {'year': year, 'month': month, **filters},
+            attendance_report_sources(year, month), lambda: self.render(year, month, filters),
+        )
+
+    def render(self, year, month, filters):
         try:
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
             from reportlab.lib.pagesizes import A4
@@ -205,9 +286,6 @@ class AttendanceMonthlyReportPDFAPIView(APIView):
             import calendar
         except ImportError:
             return HttpResponse("PDF generation library not installed", status=501)
-        year = int(request.query_params.get("year"))
-        month = int(request.query_params.get("month"))
-        employees = EmployeeProfile.objects.all()
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         styles = getSampleStyleSheet()
@@ -216,12 +294,8 @@ class AttendanceMonthlyReportPDFAPIView(APIView):
         elements.append(Paragraph(f"Attendance report of month {mname} {year}", styles["Heading1"]))
         elements.append(Spacer(1, 12))
         data = [["Employee", "Code", "Present Days", "Absent Days"]]
-        for emp in employees:
-            qs = Attendance.objects.filter(employee=emp, date__year=year, date__month=month)
-            present_days = qs.filter(is_present=True).count()
-            total_days = qs.count()
-            absent_days = max(0, total_days - present_days)
-            data.append([emp.name, emp.employee_code, present_days, absent_days])
+        for row in attendance_report_queryset(year, month, filters):
+            data.append([row["name"], row["employee_code"], row["present_days"], row["absent_days"]])
         table = Table(data, repeatRows=1)
         table.setStyle(TableStyle([
             ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
@@ -241,48 +315,24 @@ class AttendanceMonthlyReportPDFAPIView(APIView):
 
 class AttendanceMonthlyReportExcelAPIView(APIView):
     def get(self, request):
+        year = int(request.query_params.get("year"))
+        month = int(request.query_params.get("month"))
+        filters = attendance_report_filters(request)
+        return cached_report(
+            request, 'attendance_report.xlsx', {'year': year, 'month': month, **filters},
+            attendance_report_sources(year, month), lambda: self.render(year, month, filters),
+        )
+
+    def render(self, year, month, filters):
         try:
-            from openpyxl import Workbook
-            from openpyxl.utils import get_column_letter
-            from openpyxl.styles import Alignment
-            import calendar
+            from payroll_system.exports import xlsx_response
         except ImportError:
             return HttpResponse("Excel generation library not installed", status=501)
-        year = int(request.query_params.get("year"))
-        month = int(request.query_params.get("month"))
-        employees = EmployeeProfile.objects.all()
-        wb = Workbook()
-        ws = wb.active
-        mname = calendar.month_name[month]
-        ws.title = f"Attendance {month:02d}-{year}"[:31]
         headers = ["Employee", "Code", "Present Days", "Absent Days"]
-        transformed = []
-        for h in headers:
-            parts = h.split()
-            if len(parts) == 2:
-                transformed.append(f"{parts[0]}\n{parts[1]}")
-            else:
-                transformed.append(h)
-        ws.append(transformed)
-        for emp in employees:
-            qs = Attendance.objects.filter(employee=emp, date__year=year, date__month=month)
-            present_days = qs.filter(is_present=True).count()
-            total_days = qs.count()
-            absent_days = max(0, total_days - present_days)
-            ws.append([emp.name, emp.employee_code, present_days, absent_days])
-        for cell in ws[1]:
-            cell.alignment = Alignment(wrap_text=True, horizontal="center")
-        for col in range(1, len(headers) + 1):
-            max_length = 0
-            column = get_column_letter(col)
-            for cell in ws[column]:
-                val = str(cell.value) if cell.value is not None else ""
-                if len(val) > max_length:
-                    max_length = len(val)
-            ws.column_dimensions[column].width = min(max_length + 2, 25)
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        resp = HttpResponse(buffer.getvalue(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        resp['Content-Disposition'] = f'attachment; filename="attendance_report_{month:02d}_{year}.xlsx"'
-        return resp
+
+        rows = (
+            [row["name"], row["employee_code"], row["present_days"], row["absent_days"]]
+            for row in attendance_report_queryset(year, month, filters).iterator()
+        )
+
+        return xlsx_response(f"attendance_report_{month:02d}_{year}.xlsx", f"Attendance {month:02d}-{year}"[:31], headers, rows)
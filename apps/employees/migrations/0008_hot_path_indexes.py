@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_employeededuction_is_closed_and_more'),
+        ('salary', '0011_salaryrecord_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeededuction',
+            index=models.Index(condition=models.Q(('is_closed', False)), fields=['employee'], name='employeededuction_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeededuction',
+            index=models.Index(fields=['date'], name='employeededuction_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['date_of_joining'], name='employee_joining_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['status'], name='employee_status_idx'),
+        ),
+    ]
@@ -77,6 +77,13 @@ class EmployeeProfile(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Daily roster: employees joined by a date; reports filter by status
+            models.Index(fields=['date_of_joining'], name='employee_joining_idx'),
+            models.Index(fields=['status'], name='employee_status_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.pk:
             self.updated_at = timezone.now()
@@ -133,6 +140,14 @@ class EmployeeDeduction(models.Model):
     remaining_installments = models.PositiveIntegerField(null=True, blank=True)
     is_closed = models.BooleanField(default=False)  # True if fully reimbursed
 
+    class Meta:
+        indexes = [
+            # Salary generation and payments only read an employee's open deductions
+            models.Index(fields=['employee'], name='employeededuction_open_idx', condition=models.Q(is_closed=False)),
+            # Deductions report of a month
+            models.Index(fields=['date'], name='employeededuction_date_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.method == "installments":
             if not self.months or self.months <= 0:
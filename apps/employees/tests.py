@@ -1,3 +1,48 @@
+from datetime import date
+from itertools import count
 from django.test import TestCase
+from apps.salary.models import Allowance, Deduction
+from payroll_system.testing import ListQueryCountMixin
+from .models import Category, Department, Designation, EmployeeAllowance, EmployeeDeduction, EmployeeProfile, EmployeeType
+from .urls import router
 
-# Create your tests here.
+_sequence = count(1)
+
+
+def create_employee():
+    number = next(_sequence)
+    return EmployeeProfile.objects.create(
+        name=f"Employee {number}",
+        employee_code=f"E{number:04d}",
+        department=Department.objects.create(name=f"Department {number}"),
+        designation=Designation.objects.create(title=f"Designation {number}"),
+        date_of_joining=date(2024, 1, 1),
+        basic_salary=1000,
+    )
+
+
+def create_employee_with_allowances():
+    employee = create_employee()
+    for name in ("Food", "Phone"):
+        EmployeeAllowance.objects.create(
+            employee=employee, allowance=Allowance.objects.create(name=name), amount=100
+        )
+    return employee
+
+
+class ListQueryCountTests(ListQueryCountMixin, TestCase):
+
+    def test_list_endpoints_run_a_bounded_number_of_queries(self):
+        self.assertListQueriesBounded(router, {
+            'departments': lambda: Department.objects.create(name="Sales"),
+            'designations': lambda: Designation.objects.create(title="Clerk"),
+            'categories': lambda: Category.objects.create(name="Staff"),
+            'employee-types': lambda: EmployeeType.objects.create(name="Permanent"),
+            'employee-allowances': lambda: EmployeeAllowance.objects.create(
+                employee=create_employee(), allowance=Allowance.objects.create(name="Food"), amount=100
+            ),
+            'profiles': create_employee_with_allowances,
+            'employee-deductions': lambda: EmployeeDeduction.objects.create(
+                employee=create_employee(), deduction_type=Deduction.objects.create(name="Loan"), amount=300
+            ),
+        })
@@ -7,7 +7,14 @@ from rest_framework import serializers
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from calendar import monthrange
+from datetime import date
+from django.db.models import Prefetch
 from django.http import HttpResponse
+from django.utils import timezone
+from apps.salary.models import Deduction
+from payroll_system.pagination import KeysetPagination
+from payroll_system.report_cache import cached_report
 import io
 
 class AdminTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -41,13 +48,26 @@ class EmployeeProfileViewSet(viewsets.ModelViewSet):
     queryset = EmployeeProfile.objects.all()
     serializer_class = EmployeeProfileSerializer
 
+    def get_queryset(self):
+        # Prefetched allowances get their employee set from the parent, so only allowance is joined
+        return super().get_queryset().select_related('department', 'designation').prefetch_related(
+            Prefetch('employeeallowance_set', queryset=EmployeeAllowance.objects.select_related('allowance'))
+        )
+
 class EmployeeAllowanceViewSet(viewsets.ModelViewSet):
     queryset = EmployeeAllowance.objects.all()
     serializer_class = EmployeeAllowanceSerializer
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('employee', 'allowance')
+
 class EmployeeDeductionViewSet(viewsets.ModelViewSet):
     queryset = EmployeeDeduction.objects.all()
     serializer_class = EmployeeDeductionSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('employee', 'deduction_type')
 
 class EmployeesReportAPIView(APIView):
     def get(self, request):
@@ -67,8 +87,38 @@ class EmployeesReportAPIView(APIView):
         return Response(data)
 
 
+def employees_report_sources():
+    return [
+        (EmployeeProfile.objects.all(), ['created_at', 'updated_at']),
+        (Department.objects.all(), None),
+        (Designation.objects.all(), None),
+    ]
+
+
+def in_month(deductions, year, month):
+    # A date range rather than date__year/date__month, so the date index can be used
+    year, month = int(year), int(month)
+    return deductions.filter(date__range=(date(year, month, 1), date(year, month, monthrange(year, month)[1])))
+
+
+def deductions_report_sources(year, month):
+    deductions = EmployeeDeduction.objects.all()
+    if year and month:
+        deductions = in_month(deductions, year, month)
+    return [
+        (deductions, ['created_at', 'updated_at']),
+        (EmployeeProfile.objects.all(), ['created_at', 'updated_at']),
+        (Deduction.objects.all(), None),
+    ]
+
+
 class EmployeesReportPDFAPIView(APIView):
     def get(self, request):
+        # The PDF file name carries the current year
+        params = {'year': timezone.now().year}
+        return cached_report(request, 'employees_report.pdf', params, employees_report_sources(), self.render)
+
+    def render(self):
         try:
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
             from reportlab.lib.pagesizes import A4
@@ -115,52 +165,26 @@ class EmployeesReportPDFAPIView(APIView):
 
 class EmployeesReportExcelAPIView(APIView):
     def get(self, request):
+        return cached_report(request, 'employees_report.xlsx', {}, employees_report_sources(), self.render)
+
+    def render(self):
         try:
-            from openpyxl import Workbook
-            from openpyxl.utils import get_column_letter
-            from openpyxl.styles import Alignment
+            from payroll_system.exports import xlsx_response
         except ImportError:
             return HttpResponse("Excel generation library not installed", status=501)
         qs = EmployeeProfile.objects.select_related('department', 'designation').all()
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Employees"
         headers = ["ID", "Name", "Code", "Department", "Designation", "Status", "Net Salary", "DOJ"]
-        transformed = []
-        for h in headers:
-            parts = h.split()
-            if len(parts) == 2:
-                transformed.append(f"{parts[0]}\n{parts[1]}")
-            else:
-                transformed.append(h)
-        ws.append(transformed)
-        for e in qs:
-            ws.append([
-                e.id,
-                e.name or "",
-                e.employee_code or "",
-                e.department.name if e.department else "",
-                e.designation.title if e.designation else "",
-                e.status,
-                float(e.net_salary or 0),
-                (e.date_of_joining.isoformat() if e.date_of_joining else ""),
-            ])
-        for cell in ws[1]:
-            cell.alignment = Alignment(wrap_text=True, horizontal="center")
-        for col in range(1, len(headers) + 1):
-            max_length = 0
-            column = get_column_letter(col)
-            for cell in ws[column]:
-                val = str(cell.value) if cell.value is not None else ""
-                if len(val) > max_length:
-                    max_length = len(val)
-            ws.column_dimensions[column].width = min(max_length + 2, 25)
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        resp = HttpResponse(buffer.getvalue(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        resp['Content-Disposition'] = 'attachment; filename="employees_list.xlsx"'
-        return resp
+        rows = ([
+            e.id,
+            e.name or "",
+            e.employee_code or "",
+            e.department.name if e.department else "",
+            e.designation.title if e.designation else "",
+            e.status,
+            float(e.net_salary or 0),
+            (e.date_of_joining.isoformat() if e.date_of_joining else ""),
+        ] for e in qs.iterator())
+        return xlsx_response("employees_list.xlsx", "Employees", headers, rows)
 
 class EmployeeDeductionsReportAPIView(APIView):
     def get(self, request):
@@ -168,7 +192,7 @@ class EmployeeDeductionsReportAPIView(APIView):
         month = request.query_params.get("month")
         qs = EmployeeDeduction.objects.select_related('employee', 'deduction_type').all()
         if year and month:
-            qs = qs.filter(date__year=int(year), date__month=int(month))
+            qs = in_month(qs, year, month)
         data = []
         for d in qs:
             data.append({
@@ -190,6 +214,14 @@ class EmployeeDeductionsReportAPIView(APIView):
 
 class EmployeeDeductionsReportPDFAPIView(APIView):
     def get(self, request):
+        year = request.query_params.get("year")
+        month = request.query_params.get("month")
+        return cached_report(
+            request, 'deductions_report.pdf', {'year': year, 'month': month},
+            deductions_report_sources(year, month), lambda: self.render(year, month),
+        )
+
+    def render(self, year, month):
         try:
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
             from reportlab.lib.pagesizes import A4
@@ -198,11 +230,9 @@ class EmployeeDeductionsReportPDFAPIView(APIView):
             import calendar
         except ImportError:
             return HttpResponse("PDF generation library not installed", status=501)
-        year = request.query_params.get("year")
-        month = request.query_params.get("month")
         qs = EmployeeDeduction.objects.select_related('employee', 'deduction_type').all()
         if year and month:
-            qs = qs.filter(date__year=int(year), date__month=int(month))
+            qs = in_month(qs, year, month)
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         styles = getSampleStyleSheet()
@@ -249,62 +279,40 @@ class EmployeeDeductionsReportPDFAPIView(APIView):
 
 class EmployeeDeductionsReportExcelAPIView(APIView):
     def get(self, request):
+        year = request.query_params.get("year")
+        month = request.query_params.get("month")
+        return cached_report(
+            request, 'deductions_report.xlsx', {'year': year, 'month': month},
+            deductions_report_sources(year, month), lambda: self.render(year, month),
+        )
+
+    def render(self, year, month):
         try:
-            from openpyxl import Workbook
-            from openpyxl.utils import get_column_letter
-            from openpyxl.styles import Alignment
+            from payroll_system.exports import xlsx_response
         except ImportError:
             return HttpResponse("Excel generation library not installed", status=501)
-        year = request.query_params.get("year")
-        month = request.query_params.get("month")
         qs = EmployeeDeduction.objects.select_related('employee', 'deduction_type').all()
         if year and month:
-            qs = qs.filter(date__year=int(year), date__month=int(month))
-        wb = Workbook()
-        ws = wb.active
+            qs = in_month(qs, year, month)
         title = "Employee Deductions"
         if year and month:
             title = f"Deductions {int(month):02d}-{year}"
-        ws.title = title[:31]
         headers = ["ID", "Employee", "Code", "Type", "Amount", "Method", "Months", "Date", "Reimbursed", "Remaining", "Closed"]
-        transformed = []
-        for h in headers:
-            parts = h.split()
-            if len(parts) == 2:
-                transformed.append(f"{parts[0]}\n{parts[1]}")
-            else:
-                transformed.append(h)
-        ws.append(transformed)
-        for d in qs:
-            ws.append([
-                d.id,
-                d.employee.name,
-                d.employee.employee_code,
-                d.deduction_type.name if d.deduction_type else "",
-                float(d.amount or 0),
-                d.method,
-                d.months or "",
-                (d.date.isoformat() if d.date else ""),
-                float(d.reimbursed_amount or 0),
-                float(d.remaining_amount or 0),
-                d.is_closed,
-            ])
-        for cell in ws[1]:
-            cell.alignment = Alignment(wrap_text=True, horizontal="center")
-        for col in range(1, len(headers) + 1):
-            max_length = 0
-            column = get_column_letter(col)
-            for cell in ws[column]:
-                val = str(cell.value) if cell.value is not None else ""
-                if len(val) > max_length:
-                    max_length = len(val)
-            ws.column_dimensions[column].width = min(max_length + 2, 25)
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        resp = HttpResponse(buffer.getvalue(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        rows = ([
+            d.id,
+            d.employee.name,
+            d.employee.employee_code,
+            d.deduction_type.name if d.deduction_type else "",
+            float(d.amount or 0),
+            d.method,
+            d.months or "",
+            (d.date.isoformat() if d.date else ""),
+            float(d.reimbursed_amount or 0),
+            float(d.remaining_amount or 0),
+            d.is_closed,
+        ] for d in qs.iterator())
         if year and month:
-            resp['Content-Disposition'] = f'attachment; filename="employee_deductions_report_{int(month):02d}_{year}.xlsx"'
+            filename = f"employee_deductions_report_{int(month):02d}_{year}.xlsx"
         else:
-            resp['Content-Disposition'] = 'attachment; filename="employee_deductions_report.xlsx"'
-        return resp
+            filename = "employee_deductions_report.xlsx"
+        return xlsx_response(filename, title[:31], headers, rows)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Allowance, SalaryRecord
+from .models import Allowance, SalaryRecord, PayrollRun
 
 admin.site.register(Allowance)
 admin.site.register(SalaryRecord)
+admin.site.register(PayrollRun)
@@ -0,0 +1,92 @@
+import time
+from datetime import date, time as clock, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.attendance.models import Attendance, EsslPunch
+from apps.attendance.serializers import AttendanceSerializer, EsslPunchSerializer, attendance_values, essl_punch_values
+from apps.employees.models import EmployeeProfile
+from apps.salary.models import SalaryRecord
+from apps.salary.serializers import SalaryRecordSerializer, salary_record_values
+
+
+def values_row(instance, lookups):
+    """The row `.values(*lookups)` would return for a saved instance."""
+    row = {}
+    for lookup in lookups:
+        *path, name = lookup.split('__')
+        obj = instance
+        for part in path:
+            obj = getattr(obj, part)
+        row[lookup] = getattr(obj, obj._meta.get_field(name).attname)
+    return row
+
+
+def make_attendance(i, employee, now):
+    return Attendance(
+        id=i, employee=employee, date=date(2024, 11, 1) + timedelta(days=i % 30),
+        in_time=clock(9, i % 60), out_time=clock(18, i % 60) if i % 7 else None,
+        marked_manually=not i % 11, is_present=bool(i % 5), created_at=now, updated_at=now,
+    )
+
+
+def make_punch(i, employee, now):
+    punch_time = now - timedelta(minutes=i)
+    return EsslPunch(id=i, employee_code=employee.employee_code, punch_time=punch_time, punch_date=punch_time.date())
+
+
+def make_salary_record(i, employee, now):
+    return SalaryRecord(
+        id=i, employee=employee, year=2024, month=11, present_days=26, absent_days=i % 4,
+        gross_salary=Decimal('4250.50') + i, total_allowances=Decimal('300.00'),
+        total_deductions=Decimal(i % 90) / 3, paid_amount=Decimal('0'), balance_amount=Decimal('4550.50') + i,
+        status='pending', generated_on=now, updated_at=now, computed_at=now,
+        breakdown={'working_days': 26, 'per_day_salary': '163.48'},
+    )
+
+
+BENCHMARKS = [
+    ('Attendance', make_attendance, AttendanceSerializer, attendance_values),
+    ('EsslPunch', make_punch, EsslPunchSerializer, essl_punch_values),
+    ('SalaryRecord', make_salary_record, SalaryRecordSerializer, salary_record_values),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the serialization throughput of the list endpoints' ModelSerializers with "
+        "their .values() read path, on in-memory rows; checks both render the same JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        employees = [
+            EmployeeProfile(id=i, name=f"Employee {i}", employee_code=f"E{i:04d}", date_of_joining=date(2024, 1, 1))
+            for i in range(1, 201)
+        ]
+        renderer = JSONRenderer()
+
+        for rows in options["rows"]:
+            for name, make, serializer_class, values_serializer in BENCHMARKS:
+                instances = [make(i, employees[i % len(employees)], now) for i in range(1, rows + 1)]
+                values = [values_row(instance, values_serializer.lookups) for instance in instances]
+
+                started = time.perf_counter()
+                expected = serializer_class(instances, many=True).data
+                serializer_seconds = time.perf_counter() - started
+                started = time.perf_counter()
+                data = values_serializer.render(values)
+                values_seconds = time.perf_counter() - started
+
+                if renderer.render(data) != renderer.render(expected):
+                    self.stderr.write(self.style.ERROR(f"{name}: .values() output differs from {serializer_class.__name__}"))
+                self.stdout.write(
+                    f"{name:<13} {rows:>7} rows  serializer {rows / serializer_seconds:>9,.0f} rows/s  "
+                    f"values {rows / values_seconds:>9,.0f} rows/s  ({serializer_seconds / values_seconds:.1f}x)"
+                )
@@ -0,0 +1,71 @@
+from calendar import monthrange
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.attendance.models import Attendance, EsslPunch, Leave
+from apps.attendance.views import attendance_report_queryset
+from apps.employees.models import EmployeeDeduction, EmployeeProfile
+from apps.salary.models import SalaryRecord
+from apps.salary.utils import open_deductions, unpaid_dues
+
+
+def hot_queries(year, month, employee_ids):
+    """(name, queryset) of the queries run by the payroll hot paths."""
+    first_day, last_day = date(year, month, 1), date(year, month, monthrange(year, month)[1])
+    # An empty IN list short-circuits to a query that is never sent, and cannot be explained
+    employee_ids = employee_ids or [0]
+    employee_id = employee_ids[0]
+    return [
+        ("Salary records of a month",
+         SalaryRecord.objects.filter(year=year, month=month)),
+        ("Unpaid salary carried forward",
+         unpaid_dues(employee_ids, year, month)),
+        ("Open deductions of the employees being paid",
+         open_deductions(employee_ids)),
+        ("Open deductions reimbursed by a payment",
+         EmployeeDeduction.objects.filter(employee_id=employee_id, is_closed=False)),
+        ("Deductions report of a month",
+         EmployeeDeduction.objects.filter(date__range=(first_day, last_day))),
+        ("Daily roster",
+         EmployeeProfile.objects.filter(date_of_joining__lte=last_day).order_by('id')),
+        ("Employees by status",
+         EmployeeProfile.objects.filter(status='resigned')),
+        ("Approved leaves of a month",
+         Leave.objects.filter(date__range=(first_day, last_day), status='approved')),
+        ("Attendance of a month for salary rollups",
+         Attendance.objects.filter(employee_id__in=employee_ids, date__range=(first_day, last_day))),
+        ("Monthly attendance report",
+         attendance_report_queryset(year, month)),
+        ("Punches of an employee-day",
+         EsslPunch.objects.filter(employee_code='0', punch_date=last_day)),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Print the database's EXPLAIN plan of each payroll hot-path query, to spot index regressions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int)
+        parser.add_argument("--month", type=int)
+        parser.add_argument("--analyze", action="store_true",
+                            help="Run the queries and show actual timings (PostgreSQL only).")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        year, month = options["year"] or today.year, options["month"] or today.month
+        if not 1 <= month <= 12:
+            raise CommandError("--month must be between 1 and 12.")
+        explain_options = {}
+        if options["analyze"]:
+            if connection.vendor != 'postgresql':
+                raise CommandError("--analyze is only supported on PostgreSQL.")
+            explain_options = {'analyze': True, 'buffers': True}
+
+        employee_ids = list(EmployeeProfile.objects.order_by('id').values_list('id', flat=True)[:50])
+        for name, queryset in hot_queries(year, month, employee_ids):
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
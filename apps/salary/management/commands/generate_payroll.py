@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.salary.utils import compute_salary_results
+
+
+class Command(BaseCommand):
+    help = "Generate salary records for a month, optionally across several worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, required=True)
+        parser.add_argument("--month", type=int, required=True)
+        parser.add_argument(
+            "--parallel", action="store_true",
+            help="Compute across PAYROLL_WORKERS processes instead of in this process.",
+        )
+        parser.add_argument(
+            "--workers", type=int,
+            help="Number of worker processes; implies --parallel when greater than 1.",
+        )
+        parser.add_argument(
+            "--shard-by", choices=["id", "department"], default="id",
+            help="Split employees by id range or by department.",
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Recompute every employee, not only those whose inputs changed.",
+        )
+
+    def handle(self, *args, **options):
+        if not (1 <= options["month"] <= 12):
+            raise CommandError("month must be between 1 and 12.")
+        workers = options["workers"]
+        if workers is None:
+            workers = settings.PAYROLL_WORKERS if options["parallel"] else 1
+        if workers < 1:
+            raise CommandError("workers must be at least 1.")
+
+        def report_progress(processed, total):
+            self.stdout.write(f"{processed}/{total} employees computed")
+
+        results = compute_salary_results(
+            options["year"], options["month"],
+            progress=report_progress,
+            workers=workers,
+            shard_by=options["shard_by"],
+            full=options["full"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(results)} salary records for {options['month']:02d}/{options['year']}"
+        ))
@@ -0,0 +1,32 @@
+import signal
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.salary.tasks import claim_next_run, fail_interrupted_run, process_payroll_run
+
+
+class Command(BaseCommand):
+    help = "Process queued payroll runs (salary generation jobs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to wait between polls of an empty queue.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit.")
+
+    def handle(self, *args, **options):
+        # Exit through the finally block on SIGTERM so the run in progress is marked failed
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        while True:
+            run = claim_next_run()
+            if run:
+                self.stdout.write(f"Processing payroll run {run.pk} ({run.month:02d}/{run.year})")
+                try:
+                    run = process_payroll_run(run)
+                finally:
+                    fail_interrupted_run(run, "The payroll worker was stopped before the run finished.")
+                self.stdout.write(f"Payroll run {run.pk} {run.status} in {run.elapsed_seconds}s")
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_employeededuction_is_closed_and_more'),
+        ('salary', '0004_salaryrecord_balance_amount_salaryrecord_lop_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salaryrecord',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'partially_paid'])), fields=['employee'], name='salaryrecord_unpaid_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:02
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicate_records(apps, schema_editor):
+    """
+    Keep one salary record per employee and month before the unique constraint
+    is added: the one holding payment data, or else the latest generated. Months
+    where more than one duplicate was paid are left for an administrator to merge.
+    """
+    SalaryRecord = apps.get_model('salary', 'SalaryRecord')
+    duplicates = (
+        SalaryRecord.objects.values('employee_id', 'year', 'month')
+        .annotate(records=Count('id')).filter(records__gt=1)
+    )
+    conflicts = []
+    for key in duplicates:
+        records = list(
+            SalaryRecord.objects.filter(employee_id=key['employee_id'], year=key['year'], month=key['month'])
+            .order_by('-generated_on', '-id')
+        )
+        paid = [record for record in records if record.paid_amount or record.paid_date or record.status != 'pending']
+        if len(paid) > 1:
+            conflicts.append(
+                f"employee {key['employee_id']} {key['month']:02d}/{key['year']}: "
+                f"records {', '.join(str(record.pk) for record in paid)}"
+            )
+            continue
+        keep = paid[0] if paid else records[0]
+        SalaryRecord.objects.filter(pk__in=[record.pk for record in records if record.pk != keep.pk]).delete()
+    if conflicts:
+        raise RuntimeError(
+            "Cannot make salary records unique per employee and month: several records of the same "
+            "month hold payments. Combine their payments into one record and delete the others, "
+            "then run migrate again.\n" + "\n".join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_employeededuction_is_closed_and_more'),
+        ('salary', '0005_salaryrecord_unpaid_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_records, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='salaryrecord',
+            unique_together={('employee', 'year', 'month')},
+        ),
+    ]
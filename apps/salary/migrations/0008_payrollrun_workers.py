@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salary', '0007_payrollrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrollrun',
+            name='workers',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:06
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salary', '0008_payrollrun_workers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salaryrecord',
+            name='breakdown',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+        migrations.AddField(
+            model_name='salaryrecord',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='salaryrecord',
+            name='inputs_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salary', '0009_salaryrecord_incremental'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salaryrecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_employeededuction_is_closed_and_more'),
+        ('salary', '0010_salaryrecord_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salaryrecord',
+            index=models.Index(fields=['year', 'month', 'status'], name='salaryrecord_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salaryrecord',
+            index=models.Index(fields=['status', 'employee'], name='salaryrecord_status_idx'),
+        ),
+    ]
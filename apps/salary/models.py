@@ -1,4 +1,6 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 # from apps.employees.models import EmployeeProfile
 
 class Allowance(models.Model):
@@ -46,6 +48,68 @@ class SalaryRecord(models.Model):
 
 
     generated_on = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    # Incremental regeneration: the figures behind the record are kept in `breakdown`
+    # and reused until an input changes after `computed_at` (see apps.salary.signals).
+    computed_at = models.DateTimeField(null=True, blank=True)
+    inputs_changed_at = models.DateTimeField(null=True, blank=True)
+    breakdown = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        unique_together = ('employee', 'year', 'month')
+        indexes = [
+            # Carry-forward dues only ever look at unpaid months
+            models.Index(
+                fields=['employee'],
+                name='salaryrecord_unpaid_idx',
+                condition=models.Q(status__in=['pending', 'partially_paid']),
+            ),
+            # List filters: a period, optionally by status, or a status across periods
+            models.Index(fields=['year', 'month', 'status'], name='salaryrecord_period_idx'),
+            models.Index(fields=['status', 'employee'], name='salaryrecord_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee.name} - {self.month}/{self.year}"
+
+
+class PayrollRun(models.Model):
+    """A queued salary generation for one month, processed by the payroll worker."""
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+
+    year = models.IntegerField()
+    month = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    workers = models.PositiveIntegerField(default=1)
+
+    total_employees = models.IntegerField(default=0)
+    processed_employees = models.IntegerField(default=0)
+    results = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Last sign of life from the worker running it; a stale heartbeat means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payrollrun_queue_idx'),
+        ]
+
+    @property
+    def elapsed_seconds(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return round((end - self.started_at).total_seconds(), 2)
+
+    def __str__(self):
+        return f"Payroll run {self.month}/{self.year} ({self.status})"
@@ -0,0 +1,85 @@
+"""
+Process-pool sharding for payroll computation.
+
+Nothing here imports models at module level: with the "spawn" start method the
+worker processes import this module before Django is set up.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import ceil
+
+
+def init_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'payroll_system.settings')
+        django.setup()
+
+
+def compute_shard(employee_ids, year, month, last_day):
+    """Compute the salary records of one shard using the worker's own DB connection."""
+    from apps.employees.models import EmployeeProfile
+    from apps.salary.utils import _compute_salary_chunk
+
+    employees = list(EmployeeProfile.objects.filter(pk__in=employee_ids))
+    records = []
+    breakdowns = []
+    _compute_salary_chunk(employees, year, month, last_day, records, breakdowns)
+    return records, breakdowns
+
+
+def make_shards(employees, workers, shard_by='id'):
+    """
+    Split employees into lists of ids.
+    'id' gives contiguous id ranges; 'department' keeps each department together
+    (large departments are split further). No shard exceeds SALARY_CHUNK_SIZE.
+    """
+    from apps.salary.utils import SALARY_CHUNK_SIZE
+
+    if shard_by == 'department':
+        groups = {}
+        for employee in employees:
+            groups.setdefault(employee.department_id, []).append(employee.pk)
+        groups = list(groups.values())
+    elif shard_by == 'id':
+        groups = [sorted(employee.pk for employee in employees)]
+    else:
+        raise ValueError(f"Unknown shard_by value: {shard_by}")
+
+    shard_size = max(1, min(SALARY_CHUNK_SIZE, ceil(len(employees) / workers)))
+    shards = []
+    for ids in groups:
+        for offset in range(0, len(ids), shard_size):
+            shards.append(ids[offset:offset + shard_size])
+    return shards
+
+
+def compute_in_parallel(employees, year, month, last_day, workers, shard_by='id', progress=None):
+    """
+    Compute salary records for `employees` across `workers` processes.
+    Returns (records, breakdowns) in the same order as `employees`, ready to be
+    written by the caller in a single transaction.
+    """
+    from django.db import connections
+
+    shards = make_shards(employees, workers, shard_by)
+    # Forked workers must not share the parent's open connections; they reconnect on first query.
+    connections.close_all()
+
+    computed = {}
+    processed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = [pool.submit(compute_shard, ids, year, month, last_day) for ids in shards]
+        for future in as_completed(futures):
+            records, breakdowns = future.result()
+            for record, breakdown in zip(records, breakdowns):
+                computed[record.employee_id] = (record, breakdown)
+            processed += len(records)
+            if progress:
+                progress(processed, len(employees))
+
+    records = [computed[employee.pk][0] for employee in employees]
+    breakdowns = [computed[employee.pk][1] for employee in employees]
+    return records, breakdowns
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import SalaryRecord, Allowance, Deduction
+from payroll_system.values_serializers import ValuesSerializer
+from .models import SalaryRecord, Allowance, Deduction, PayrollRun
 
 class AllowanceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,4 +17,17 @@ class SalaryRecordSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SalaryRecord
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+salary_record_values = ValuesSerializer(SalaryRecordSerializer)
+
+class PayrollRunSerializer(serializers.ModelSerializer):
+    elapsed_seconds = serializers.ReadOnlyField()
+
+    class Meta:
+        model = PayrollRun
+        fields = [
+            'id', 'year', 'month', 'status', 'workers',
+            'total_employees', 'processed_employees', 'elapsed_seconds',
+            'results', 'error', 'created_at', 'started_at', 'finished_at', 'heartbeat_at',
+        ]
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from apps.attendance.models import Attendance, Leave
+from apps.employees.models import EmployeeDeduction, EmployeeProfile
+from .models import SalaryRecord
+from .utils import mark_salary_dirty
+
+SALARY_FIELDS = ('basic_salary', 'house_rent_allowance', 'transportation_allowance', 'cost_of_living_allowance')
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=Leave)
+@receiver(post_delete, sender=Leave)
+def mark_month_dirty(sender, instance, **kwargs):
+    # Attendance and leaves only affect the month they fall in, and the one a moved row left
+    mark_salary_dirty(instance.employee_id, instance.date.year, instance.date.month)
+    previous_employee_id, previous_date = getattr(instance, '_loaded_key', (None, None))
+    if previous_date is not None and (previous_employee_id, previous_date.year, previous_date.month) != (
+        instance.employee_id, instance.date.year, instance.date.month
+    ):
+        mark_salary_dirty(previous_employee_id, previous_date.year, previous_date.month)
+
+
+@receiver(post_save, sender=EmployeeDeduction)
+@receiver(post_delete, sender=EmployeeDeduction)
+def mark_deduction_dirty(sender, instance, **kwargs):
+    # Installments and next-month deductions span several months
+    mark_salary_dirty(instance.employee_id)
+
+
+@receiver(post_save, sender=SalaryRecord)
+@receiver(post_delete, sender=SalaryRecord)
+def mark_other_months_dirty(sender, instance, **kwargs):
+    # A payment changes the dues carried forward into the employee's other months
+    mark_salary_dirty(instance.employee_id, exclude_pk=instance.pk)
+
+
+@receiver(pre_save, sender=EmployeeProfile)
+def mark_salary_change_dirty(sender, instance, **kwargs):
+    if not instance.pk:
+        return
+    previous = EmployeeProfile.objects.filter(pk=instance.pk).values(*SALARY_FIELDS).first()
+    if previous and any(previous[field] != getattr(instance, field) for field in SALARY_FIELDS):
+        mark_salary_dirty(instance.pk)
@@ -0,0 +1,100 @@
+"""
+Database-backed queue for payroll runs.
+
+GenerateSalaryAPIView enqueues a PayrollRun and returns straight away; the
+`process_payroll_runs` management command claims queued runs and executes them.
+A running run's worker records a heartbeat with every progress report; a run whose
+heartbeat is older than PAYROLL_RUN_STALE_SECONDS lost its worker, and is failed
+and queued again.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PayrollRun
+from .utils import compute_salary_results
+
+logger = logging.getLogger(__name__)
+
+
+STALE_RUN_ERROR = "The worker stopped reporting progress; the run was queued again."
+
+
+def stale_runs():
+    """Running runs whose worker has not reported progress within PAYROLL_RUN_STALE_SECONDS."""
+    cutoff = timezone.now() - timedelta(seconds=settings.PAYROLL_RUN_STALE_SECONDS)
+    return PayrollRun.objects.filter(status="running").filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+
+
+def requeue_stale_runs():
+    """Fail the runs abandoned by a dead worker and queue their month again."""
+    for run in stale_runs():
+        failed = stale_runs().filter(pk=run.pk).update(
+            status="failed", error=STALE_RUN_ERROR, finished_at=timezone.now()
+        )
+        if failed:
+            logger.warning("Payroll run %s lost its worker; queueing %02d/%s again", run.pk, run.month, run.year)
+            enqueue_payroll_run(run.year, run.month, workers=run.workers, requeue_stale=False)
+
+
+def fail_interrupted_run(run, error):
+    """Mark a run failed if its worker is stopping before the run finished."""
+    PayrollRun.objects.filter(pk=run.pk, status="running").update(
+        status="failed", error=error, finished_at=timezone.now()
+    )
+
+
+def enqueue_payroll_run(year, month, workers=1, requeue_stale=True):
+    """Queue a run for the month, reusing one that is already queued or running."""
+    if requeue_stale:
+        requeue_stale_runs()
+    run = PayrollRun.objects.filter(year=year, month=month, status__in=["queued", "running"]).first()
+    if run:
+        return run
+    return PayrollRun.objects.create(year=year, month=month, workers=workers)
+
+
+def claim_next_run():
+    """
+    Move the oldest queued run to running and return it, or None if the queue is empty.
+    The conditional update makes the claim safe when several workers poll the same table.
+    """
+    requeue_stale_runs()
+    for run_id in PayrollRun.objects.filter(status="queued").order_by("created_at").values_list("id", flat=True)[:10]:
+        now = timezone.now()
+        claimed = PayrollRun.objects.filter(pk=run_id, status="queued").update(
+            status="running", started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return PayrollRun.objects.get(pk=run_id)
+    return None
+
+
+def process_payroll_run(run):
+    def report_progress(processed, total):
+        PayrollRun.objects.filter(pk=run.pk).update(
+            processed_employees=processed, total_employees=total, heartbeat_at=timezone.now()
+        )
+
+    try:
+        results = compute_salary_results(run.year, run.month, progress=report_progress, workers=run.workers)
+    except Exception as exc:
+        logger.exception("Payroll run %s failed", run.pk)
+        run.status = "failed"
+        run.error = str(exc)
+        run.finished_at = timezone.now()
+        run.save(update_fields=["status", "error", "finished_at"])
+        return run
+
+    run.status = "completed"
+    run.results = results
+    run.total_employees = len(results)
+    run.processed_employees = len(results)
+    run.finished_at = timezone.now()
+    run.save(update_fields=["status", "results", "total_employees", "processed_employees", "finished_at"])
+    return run
@@ -1,3 +1,357 @@
-from django.test import TestCase
+import os
+import tempfile
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from apps.attendance.models import Attendance, Leave, LeaveType
+from apps.employees.models import EmployeeDeduction
+from apps.employees.tests import create_employee
+from payroll_system.report_cache import cached_report
+from payroll_system.testing import ListQueryCountMixin
+from .models import Allowance, Deduction, PayrollRun, SalaryRecord
+from .serializers import SalaryRecordSerializer, salary_record_values
+from .tasks import STALE_RUN_ERROR, claim_next_run, enqueue_payroll_run
+from .utils import (
+    calculate_deductions, calculate_deductions_bulk, calculate_previous_dues, calculate_working_days_bulk,
+    compute_salary_results,
+)
+from .urls import router
 
-# Create your tests here.
+
+class ListQueryCountTests(ListQueryCountMixin, TestCase):
+
+    def test_list_endpoints_run_a_bounded_number_of_queries(self):
+        self.assertListQueriesBounded(router, {
+            'allowances': lambda: Allowance.objects.create(name="Food"),
+            'deductions': lambda: Deduction.objects.create(name="Loan"),
+            'records': lambda: SalaryRecord.objects.create(
+                employee=create_employee(), year=2024, month=11, gross_salary=1000
+            ),
+            'runs': lambda: PayrollRun.objects.create(year=2024, month=11),
+        })
+
+
+class ValuesSerializerTests(TestCase):
+
+    def test_salary_record_values_match_serializer(self):
+        SalaryRecord.objects.create(
+            employee=create_employee(), year=2024, month=10, gross_salary=Decimal('4250.5'),
+            total_deductions=Decimal('12.345'), paid_amount=Decimal('4238.16'), status='paid',
+            paid_date=date(2024, 11, 1), computed_at=timezone.now(), breakdown={'working_days': 26},
+        )
+        SalaryRecord.objects.create(employee=create_employee(), year=2024, month=11, gross_salary=1000)
+        queryset = SalaryRecord.objects.order_by('id')
+
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(salary_record_values.render(salary_record_values.values(queryset))),
+            renderer.render(SalaryRecordSerializer(queryset, many=True).data),
+        )
+
+
+class ListFilterTests(TestCase):
+
+    def test_salary_record_filters(self):
+        employee = create_employee()
+        for month, status in ((10, 'paid'), (11, 'pending')):
+            SalaryRecord.objects.create(employee=employee, year=2024, month=month, gross_salary=1000, status=status)
+        SalaryRecord.objects.create(employee=create_employee(), year=2024, month=11, gross_salary=1000)
+
+        response = self.client.get('/api/salary/records/', {'year': 2024, 'month': 11, 'employee': employee.id})
+        self.assertEqual([row['month'] for row in response.json()['results']], [11])
+        response = self.client.get('/api/salary/records/', {'status': 'pending'})
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get('/api/salary/records/', {'status': 'void'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExplainQueriesTests(TestCase):
+
+    def test_prints_a_plan_for_every_hot_query(self):
+        create_employee()
+        out = StringIO()
+        call_command('explain_queries', year=2024, month=11, stdout=out, no_color=True)
+        self.assertIn("Unpaid salary carried forward", out.getvalue())
+        self.assertIn("Punches of an employee-day", out.getvalue())
+
+    def test_explains_on_an_empty_database(self):
+        out = StringIO()
+        call_command('explain_queries', year=2024, month=11, stdout=out, no_color=True)
+        self.assertIn("Open deductions of the employees being paid", out.getvalue())
+
+
+@override_settings(PAYROLL_RUN_STALE_SECONDS=60)
+class PayrollRunQueueTests(TestCase):
+
+    def running_run(self, heartbeat_age):
+        heartbeat_at = timezone.now() - timedelta(seconds=heartbeat_age)
+        return PayrollRun.objects.create(
+            year=2024, month=11, workers=2, status="running", started_at=heartbeat_at, heartbeat_at=heartbeat_at
+        )
+
+    def test_live_run_is_reused(self):
+        run = self.running_run(heartbeat_age=10)
+        self.assertEqual(enqueue_payroll_run(2024, 11), run)
+        self.assertIsNone(claim_next_run())
+
+    def test_stale_run_is_failed_and_queued_again(self):
+        stale = self.running_run(heartbeat_age=120)
+
+        with self.assertLogs('apps.salary.tasks', 'WARNING'):
+            claimed = claim_next_run()
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.error), ("failed", STALE_RUN_ERROR))
+        self.assertEqual((claimed.year, claimed.month, claimed.workers), (2024, 11, 2))
+        self.assertEqual(claimed.status, "running")
+        self.assertIsNotNone(claimed.heartbeat_at)
+
+    def test_enqueue_replaces_stale_run(self):
+        stale = self.running_run(heartbeat_age=120)
+        with self.assertLogs('apps.salary.tasks', 'WARNING'):
+            run = enqueue_payroll_run(2024, 11)
+        self.assertNotEqual(run, stale)
+        self.assertEqual(run.status, "queued")
+        self.assertEqual(PayrollRun.objects.filter(status="queued").count(), 1)
+
+
+def create_mixed_payroll():
+    """
+    Four employees with November 2024 attendance, leaves, deductions and other months'
+    salary records covering the cases the salary calculation distinguishes.
+    """
+    employees = [create_employee() for _ in range(4)]
+    first, second, third, fourth = employees
+    leave_type = LeaveType.objects.create(name="Annual")
+    advance, loan = Deduction.objects.create(name="Advance"), Deduction.objects.create(name="Loan")
+
+    for day in (4, 5, 6, 10):  # the 10th is a Sunday
+        Attendance.objects.create(employee=first, date=date(2024, 11, day), is_present=True)
+    Attendance.objects.create(employee=first, date=date(2024, 11, 7), is_present=False)
+    Attendance.objects.create(employee=second, date=date(2024, 11, 4), is_present=True)
+    Attendance.objects.create(employee=fourth, date=date(2024, 11, 30), is_present=True)
+    for employee, day, status in (
+        (second, 4, 'approved'), (second, 5, 'approved'), (second, 6, 'pending'), (second, 8, 'rejected'),
+        (fourth, 17, 'approved'), (first, 29, 'approved'),
+    ):
+        Leave.objects.create(employee=employee, date=date(2024, 11, day), leave_type=leave_type, status=status)
+
+    EmployeeDeduction.objects.create(
+        employee=first, deduction_type=advance, amount=300, method='next_month', date=date(2024, 10, 15))
+    EmployeeDeduction.objects.create(
+        employee=first, deduction_type=loan, amount=600, method='installments', months=3, date=date(2024, 9, 1))
+    EmployeeDeduction.objects.create(
+        employee=second, deduction_type=loan, amount=400, method='annual_leave', date=date(2024, 6, 1))
+    closed = EmployeeDeduction.objects.create(
+        employee=second, deduction_type=advance, amount=250, method='next_month', date=date(2024, 10, 2))
+    EmployeeDeduction.objects.filter(pk=closed.pk).update(is_closed=True)
+    EmployeeDeduction.objects.create(employee=third, amount=90, method='next_month', date=date(2024, 10, 2))
+    EmployeeDeduction.objects.create(
+        employee=fourth, deduction_type=advance, amount=120, method='next_month', date=date(2024, 11, 3))
+
+    for employee, month, gross, paid, balance, status in (
+        (first, 10, 1000, 200, 0, 'pending'),
+        (first, 9, 900, 900, 0, 'paid'),
+        (second, 10, 800, 650, 150, 'partially_paid'),
+        (third, 11, 500, 0, 0, 'pending'),
+        (fourth, 10, 100, 300, 0, 'pending'),
+    ):
+        SalaryRecord.objects.create(
+            employee=employee, year=2024, month=month, gross_salary=gross,
+            paid_amount=paid, balance_amount=balance, status=status,
+        )
+    return employees
+
+
+def reference_working_days(employee, year, month, last_day):
+    """Day-by-day count of one employee's working days, read from Attendance and Leave."""
+    present_days = absent_days = sunday_count = approved_leave_count = 0
+    for day in range(1, last_day + 1):
+        current_date = date(year, month, day)
+        if current_date.weekday() == 6:
+            sunday_count += 1
+        elif Attendance.objects.filter(employee=employee, date=current_date, is_present=True).exists():
+            present_days += 1
+        elif Leave.objects.filter(employee=employee, date=current_date, status='approved').exists():
+            approved_leave_count += 1
+        else:
+            absent_days += 1
+    return present_days, absent_days, sunday_count, approved_leave_count
+
+
+def reference_previous_due(employee, year, month):
+    """Unpaid salary of one employee's other months, summed record by record."""
+    previous_due = Decimal(0)
+    records = SalaryRecord.objects.filter(employee=employee, status__in=["pending", "partially_paid"])
+    for record in records.exclude(year=year, month=month):
+        if record.balance_amount and record.balance_amount > 0:
+            previous_due += record.balance_amount
+        else:
+            previous_due += max(Decimal(0), record.gross_salary - (record.paid_amount or Decimal(0)))
+    return previous_due
+
+
+class BulkCalculationTests(TestCase):
+    months = ((2024, 11), (2024, 12))
+
+    def setUp(self):
+        self.employees = create_mixed_payroll()
+
+    def test_working_days_match_per_employee_reference(self):
+        for year, month in self.months:
+            last_day = monthrange(year, month)[1]
+            working_days = calculate_working_days_bulk(self.employees, year, month, last_day)
+            for employee in self.employees:
+                with self.subTest(employee=employee.employee_code, month=month):
+                    self.assertEqual(
+                        working_days[employee.pk], reference_working_days(employee, year, month, last_day)
+                    )
+
+    def test_deductions_match_per_employee_calculation(self):
+        for year, month in self.months:
+            deductions = calculate_deductions_bulk(self.employees, year, month)
+            for employee in self.employees:
+                with self.subTest(employee=employee.employee_code, month=month):
+                    self.assertEqual(deductions[employee.pk], calculate_deductions(employee, year, month))
+
+    def test_previous_dues_match_per_employee_reference(self):
+        for year, month in self.months:
+            previous_dues = calculate_previous_dues(self.employees, year, month)
+            for employee in self.employees:
+                with self.subTest(employee=employee.employee_code, month=month):
+                    self.assertEqual(previous_dues[employee.pk], reference_previous_due(employee, year, month))
+
+
+class IncrementalGenerationTests(TestCase):
+
+    def assertIncrementalMatchesFull(self):
+        for month in (10, 11):
+            incremental = compute_salary_results(2024, month)
+            self.assertEqual(incremental, compute_salary_results(2024, month, full=True))
+
+    def test_incremental_generation_matches_full_after_edits(self):
+        first, second, third, fourth = create_mixed_payroll()
+        self.assertIncrementalMatchesFull()
+
+        with self.subTest("attendance"):
+            Attendance.objects.create(employee=third, date=date(2024, 11, 12), is_present=True)
+            attendance = Attendance.objects.get(employee=first, date=date(2024, 11, 5))
+            attendance.is_present = False
+            attendance.save()
+            self.assertIncrementalMatchesFull()
+        with self.subTest("moved row"):
+            attendance = Attendance.objects.get(employee=first, date=date(2024, 11, 4))
+            attendance.employee = third
+            attendance.save()
+            leave = Leave.objects.get(employee=second, date=date(2024, 11, 5))
+            leave.date = date(2024, 10, 8)
+            leave.save()
+            self.assertIncrementalMatchesFull()
+        with self.subTest("leave"):
+            leave = Leave.objects.get(employee=second, date=date(2024, 11, 6))
+            leave.status = 'approved'
+            leave.save()
+            self.assertIncrementalMatchesFull()
+        with self.subTest("payment"):
+            record = SalaryRecord.objects.get(employee=first, year=2024, month=10)
+            response = self.client.patch(
+                f'/api/salary/pay/{record.pk}/', {'paid_amount': '50.00'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertIncrementalMatchesFull()
+        with self.subTest("salary"):
+            fourth.basic_salary += 500
+            fourth.save()
+            record = SalaryRecord.objects.get(employee=second, year=2024, month=10)
+            record.balance_amount = 40
+            record.save()
+            self.assertIncrementalMatchesFull()
+
+
+class ReportCacheTests(TestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+        settings_override = override_settings(REPORT_CACHE_DIR=self.cache_dir, REPORT_CACHE_MAX_BYTES=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.builds = []
+        self.record = SalaryRecord.objects.create(employee=create_employee(), year=2024, month=11, gross_salary=1000)
+
+    def report(self, name='report', **headers):
+        def build():
+            self.builds.append(name)
+            return HttpResponse(f"{name}:{len(self.builds)}".ljust(10).encode(), content_type='text/plain')
+
+        request = RequestFactory().get('/report/', **headers)
+        sources = [(SalaryRecord.objects.filter(year=2024, month=11), ['generated_on', 'updated_at'])]
+        response = cached_report(request, 'report.txt', {'name': name}, sources, build)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+
+    def cached_etags(self):
+        # Entries are stored under the full key, of which the ETag is the first 32 characters
+        return {f'"{name[:32]}"' for name in os.listdir(self.cache_dir) if name.endswith('.data')}
+
+    def test_repeated_request_is_served_from_the_cache(self):
+        first, first_content = self.report()
+        second, second_content = self.report()
+
+        self.assertEqual(self.builds, ['report'])
+        self.assertEqual(second_content, first_content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Content-Type'], 'text/plain')
+
+    def test_matching_etag_is_not_modified(self):
+        first, _ = self.report()
+        response, content = self.report(HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(content, b'')
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(self.builds, ['report'])
+
+    def test_source_change_builds_under_a_new_key(self):
+        first, _ = self.report()
+        response = self.client.patch(
+            f'/api/salary/pay/{self.record.pk}/', {'paid_amount': '100.00'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        second, content = self.report(HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(content.strip(), b'report:2')
+
+    def test_salary_export_etag_changes_after_a_payment(self):
+        url = '/api/salary/reports/salaries.xlsx'
+        first = self.client.get(url, {'year': 2024, 'month': 11})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(url, {'year': 2024, 'month': 11})['ETag'], first['ETag'])
+        self.client.patch(f'/api/salary/pay/{self.record.pk}/', {'paid_amount': '100.00'}, content_type='application/json')
+        self.assertNotEqual(self.client.get(url, {'year': 2024, 'month': 11})['ETag'], first['ETag'])
+
+    @override_settings(REPORT_CACHE_MAX_BYTES=25)
+    def test_least_recently_used_entry_is_evicted(self):
+        older, _ = self.report('older')
+        newer, _ = self.report('newer')
+        for response, mtime in ((older, 100), (newer, 200)):
+            data_path = next(
+                os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                if name.endswith('.data') and f'"{name[:32]}"' == response['ETag']
+            )
+            os.utime(data_path, (mtime, mtime))
+        # Reading `older` makes `newer` the least recently used; a third 10-byte entry exceeds the cap
+        self.report('older')
+        third, _ = self.report('third')
+
+        self.assertEqual(self.cached_etags(), {older['ETag'], third['ETag']})
+        self.report('newer')
+        self.assertEqual(self.builds, ['older', 'newer', 'third', 'newer'])
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from .views import GenerateSalaryAPIView, AllowanceViewSet, DeductionViewSet, PaySalaryAPIView, SalaryReportPDFAPIView, SalaryReportExcelAPIView, SalaryRecordViewSet
+from .views import GenerateSalaryAPIView, AllowanceViewSet, DeductionViewSet, PaySalaryAPIView, SalaryReportPDFAPIView, SalaryReportExcelAPIView, SalaryRecordViewSet, PayrollRunViewSet
 
 from rest_framework.routers import DefaultRouter
 
@@ -7,6 +7,7 @@ router = DefaultRouter()
 router.register(r'allowances', AllowanceViewSet)
 router.register(r'deductions', DeductionViewSet)
 router.register(r'records', SalaryRecordViewSet)
+router.register(r'runs', PayrollRunViewSet)
 
 
 urlpatterns = [
@@ -1,8 +1,16 @@
 from decimal import Decimal
-from apps.employees.models import EmployeeDeduction
-from apps.attendance.models import Attendance, Leave
+from apps.employees.models import EmployeeDeduction, EmployeeProfile
+from apps.attendance.models import AttendanceMonthlyRollup
+from .models import SalaryRecord
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.utils import timezone
 from datetime import date
 from calendar import monthrange
+from collections import defaultdict
+
+SALARY_CHUNK_SIZE = 500
+SALARY_RECORD_BATCH_SIZE = 500
 
 # def calculate_deductions(employee, year, month):
 #     """
@@ -43,7 +51,32 @@ def calculate_deductions(employee, year, month):
     Calculate total deductions for an employee for a given month.
     Returns a tuple: (advance_amount, other_deductions_amount)
     """
-    deductions = EmployeeDeduction.objects.filter(employee=employee)
+    deductions = EmployeeDeduction.objects.filter(employee=employee).select_related('deduction_type')
+    return _sum_deductions(deductions, year, month)
+
+
+def calculate_deductions_bulk(employees, year, month):
+    """
+    Calculate deductions for a set of employees with a single query.
+    Returns a dict: {employee_id: (advance_amount, other_deductions_amount)}
+    """
+    deductions_by_employee = defaultdict(list)
+    for deduction in open_deductions(employees):
+        deductions_by_employee[deduction.employee_id].append(deduction)
+
+    return {
+        employee.pk: _sum_deductions(deductions_by_employee[employee.pk], year, month)
+        for employee in employees
+    }
+
+
+def open_deductions(employees):
+    return EmployeeDeduction.objects.filter(
+        employee__in=employees, is_closed=False, deduction_type__isnull=False
+    ).select_related('deduction_type')
+
+
+def _sum_deductions(deductions, year, month):
     advance_amount = Decimal("0.00")
     other_deductions = Decimal("0.00")
 
@@ -74,6 +107,32 @@ def calculate_deductions(employee, year, month):
     return advance_amount, other_deductions
 
 
+def calculate_previous_dues(employees, year, month):
+    """
+    Calculate unpaid salary carried forward from other months for a set of employees.
+    Uses balance_amount where it is set, otherwise derives it from gross_salary - paid_amount.
+    Returns a dict: {employee_id: previous_due}
+    """
+    dues = {row['employee_id']: row['total_due'] or Decimal(0) for row in unpaid_dues(employees, year, month)}
+    return {employee.pk: dues.get(employee.pk, Decimal(0)) for employee in employees}
+
+
+def unpaid_dues(employees, year, month):
+    """Rows of employee_id and total_due: what is owed on the employees' unpaid records of other months."""
+    money = DecimalField(max_digits=12, decimal_places=2)
+    due = Case(
+        When(balance_amount__gt=0, then=F('balance_amount')),
+        # Fallback: balance not yet computed, derive it
+        When(gross_salary__gt=F('paid_amount'), then=F('gross_salary') - F('paid_amount')),
+        default=Value(Decimal(0)),
+        output_field=money,
+    )
+    return SalaryRecord.objects.filter(
+        employee__in=employees,
+        status__in=["pending", "partially_paid"],
+    ).exclude(year=year, month=month).values('employee_id').annotate(total_due=Sum(due, output_field=money)).order_by()
+
+
 def apply_reimbursement(self, paid_amount):
     """
     Apply salary payment to reduce this deduction.
@@ -105,35 +164,267 @@ def apply_reimbursement(self, paid_amount):
 
 
 def calculate_working_days(employee, year, month, last_day):
-    present_days = 0
-    absent_days = 0
-    sunday_count = 0
-    approved_leave_count = 0
+    return calculate_working_days_bulk([employee], year, month, last_day)[employee.pk]
+
 
+def calculate_working_days_bulk(employees, year, month, last_day):
+    """
+    Calculate working day counts for a set of employees in one pass.
+    Reads the present and approved-leave day bitmaps (bit N set = day N of the month)
+    from the attendance rollups with one query.
+    Returns a dict: {employee_id: (present_days, absent_days, sunday_count, approved_leave_count)}
+    """
+    sunday_mask = 0
     for day in range(1, last_day + 1):
-        current_date = date(year, month, day)
+        if date(year, month, day).weekday() == 6:  # Sunday is 6
+            sunday_mask |= 1 << day
+    month_mask = (1 << (last_day + 1)) - 2  # bits 1..last_day
+    working_mask = month_mask & ~sunday_mask
+    sunday_count = sunday_mask.bit_count()
+    working_day_count = working_mask.bit_count()
 
-        # Skip Sundays
-        if current_date.weekday() == 6:  # Sunday is 6
-            sunday_count += 1
-            continue
+    present_bits = defaultdict(int)
+    leave_bits = defaultdict(int)
+    rollups = AttendanceMonthlyRollup.objects.filter(
+        employee__in=employees, year=year, month=month
+    ).values_list('employee_id', 'present_mask', 'leave_mask')
+    for employee_id, present_mask, leave_mask in rollups:
+        present_bits[employee_id] = present_mask
+        leave_bits[employee_id] = leave_mask
+
+    results = {}
+    for employee in employees:
+        present = present_bits[employee.pk] & working_mask
+        # A present day is never counted as leave
+        leave = leave_bits[employee.pk] & working_mask & ~present
+        present_days = present.bit_count()
+        approved_leave_count = leave.bit_count()
+        absent_days = working_day_count - present_days - approved_leave_count
+        results[employee.pk] = (present_days, absent_days, sunday_count, approved_leave_count)
+    return results
 
-        attendance = Attendance.objects.filter(
-            employee=employee, date=current_date, is_present=True
-        ).first()
 
-        if attendance and attendance.is_present:
-            present_days += 1
+def compute_salary_results(year, month, progress=None, workers=None, shard_by='id', full=False):
+    """
+    Generate the salary records of every employee for a month.
+    Only employees whose record is missing or stale (see needs_recompute) are recomputed;
+    everyone else is served from the stored breakdown. Pass full=True to recompute everyone.
+    Inputs are loaded in chunks of SALARY_CHUNK_SIZE employees; `progress`, if given,
+    is called as progress(processed, total) after each chunk.
+    With workers > 1 the chunks are computed in a process pool (see apps.salary.parallel),
+    sharded by employee id range or by department.
+    Returns the list of per-employee salary rows.
+    """
+    started_at = timezone.now()
+    today = date.today()
+    if year == today.year and month == today.month:
+        last_day = today.day
+    else:
+        last_day = monthrange(year, month)[1]
+    # A record computed before this day may have counted too few days of the month
+    fresh_on = min(today, date(year, month, monthrange(year, month)[1]))
+
+    results = []
+    employees = list(EmployeeProfile.objects.all())
+    existing = {record.employee_id: record for record in SalaryRecord.objects.filter(year=year, month=month)}
+    breakdowns = {}
+    dirty = []
+    for employee in employees:
+        record = existing.get(employee.id)
+        if full or needs_recompute(record, fresh_on):
+            dirty.append(employee)
         else:
-            # Check for approved leave
-            leave = Leave.objects.filter(
-                employee=employee, date=current_date, status='approved'
-            ).exists()
-            
-            if leave:
-                approved_leave_count += 1
-            else:
-                absent_days += 1
-
-    return present_days, absent_days, sunday_count, approved_leave_count
+            breakdowns[employee.id] = _decode_breakdown(record.breakdown)
+
+    cached = len(employees) - len(dirty)
+    if progress:
+        progress(cached, len(employees))
+    records = []
+    if workers and workers > 1 and dirty:
+        from .parallel import compute_in_parallel
+        chunk_progress = (lambda done, total: progress(cached + done, len(employees))) if progress else None
+        records, computed = compute_in_parallel(dirty, year, month, last_day, workers, shard_by, chunk_progress)
+    else:
+        computed = []
+        for offset in range(0, len(dirty), SALARY_CHUNK_SIZE):
+            chunk = dirty[offset:offset + SALARY_CHUNK_SIZE]
+            _compute_salary_chunk(chunk, year, month, last_day, records, computed)
+            if progress:
+                progress(cached + offset + len(chunk), len(employees))
+    for record, breakdown in zip(records, computed):
+        record.computed_at = started_at
+        record.breakdown = breakdown
+        breakdowns[record.employee_id] = breakdown
+
+    # Insert new records and refresh the computed fields of existing ones in one transaction;
+    # payment fields (status, paid_amount, balance_amount, paid_date) are left untouched.
+    with transaction.atomic():
+        SalaryRecord.objects.bulk_create(
+            records,
+            batch_size=SALARY_RECORD_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['employee', 'year', 'month'],
+            update_fields=[
+                'present_days', 'absent_days', 'lop_count', 'total_allowances',
+                'total_deductions', 'gross_salary', 'salary_due',
+                'computed_at', 'breakdown', 'updated_at',
+            ],
+        )
+        # A new or changed gross salary alters the dues carried into the employee's other months
+        changed = [
+            record.employee_id for record in records
+            if record.employee_id not in existing
+            or existing[record.employee_id].gross_salary != record.gross_salary.quantize(Decimal('0.01'))
+        ]
+        if changed:
+            SalaryRecord.objects.filter(employee_id__in=changed).exclude(year=year, month=month).update(
+                inputs_changed_at=timezone.now()
+            )
+        saved = SalaryRecord.objects.filter(year=year, month=month, employee__in=employees).values(
+            'id', 'employee_id', 'status', 'paid_amount', 'balance_amount', 'paid_date',
+        )
+        saved = {row['employee_id']: row for row in saved}
+
+    # Round all monetary values to 2 decimal places
+    cents = Decimal('0.01')
+    for employee in employees:
+        row = saved[employee.id]
+        b = breakdowns[employee.id]
+        results.append({
+            'id': row['id'],
+            'employee_id': employee.id,
+            'employee_name': employee.name,
+            'employee_number': employee.employee_code,
+            'present_days': b['present_days'],
+            'absent_days': b['absent_days'],
+            'leave_count': b['sunday_count'],
+            'approved_leave_count': b['approved_leave_count'],
+            'basic_salary': float(b['basic'].quantize(cents)),
+            'gross_basic_salary': float(b['gross_basic'].quantize(cents)),
+            'house_rent_allowance': float(b['hra'].quantize(cents)),
+            'transportation_allowance': float(b['transport'].quantize(cents)),
+            'cost_of_living_allowance': float(b['col_allowance'].quantize(cents)),
+            'total_allowance': float(b['total_allowance'].quantize(cents)),
+            'salary_on_attendance': float(b['salary_on_attendance'].quantize(cents)),
+            'advance_deduction': float(b['advance_deduction'].quantize(cents)),
+            'other_deductions': float(b['other_deductions'].quantize(cents)),
+            'total_deduction': float(b['total_deductions'].quantize(cents)),
+            'total_salary': float(b['total_salary'].quantize(cents)),
+            'holiday_count': b['sunday_count'],
+            'status': row['status'],
+            'paid_amount': float(row['paid_amount'].quantize(cents)) if row['paid_amount'] else 0.0,
+            'balance_amount': float((row['balance_amount'] or ((b['total_salary'] + b['previous_due']) - (row['paid_amount'] or Decimal(0)))).quantize(cents)),
+            'paid_date': row['paid_date'],
+        })
+    return results
+
+
+def needs_recompute(record, fresh_on):
+    """
+    True if a month's salary record has to be recomputed: it is missing, predates
+    incremental tracking, was computed before `fresh_on`, or one of its inputs
+    changed after it was computed.
+    """
+    if record is None or record.computed_at is None or not record.breakdown:
+        return True
+    if record.inputs_changed_at and record.inputs_changed_at >= record.computed_at:
+        return True
+    return timezone.localdate(record.computed_at) < fresh_on
+
+
+def mark_salary_dirty(employee_id, year=None, month=None, exclude_pk=None):
+    """
+    Flag an employee's salary records as stale so the next generation recomputes them.
+    Without year/month every month of the employee is flagged.
+    """
+    records = SalaryRecord.objects.filter(employee_id=employee_id)
+    if year is not None:
+        records = records.filter(year=year, month=month)
+    if exclude_pk is not None:
+        records = records.exclude(pk=exclude_pk)
+    records.update(inputs_changed_at=timezone.now())
+
+
+def mark_months_dirty(months):
+    """
+    Flag many (employee_id, year, month) salary records as stale at once,
+    for bulk writes that bypass the model signals.
+    """
+    employees_by_month = defaultdict(set)
+    for employee_id, year, month in months:
+        employees_by_month[(year, month)].add(employee_id)
+    now = timezone.now()
+    for (year, month), employee_ids in employees_by_month.items():
+        SalaryRecord.objects.filter(
+            year=year, month=month, employee_id__in=employee_ids
+        ).update(inputs_changed_at=now)
+
+
+BREAKDOWN_DECIMAL_KEYS = (
+    'basic', 'gross_basic', 'hra', 'transport', 'col_allowance', 'total_allowance',
+    'salary_on_attendance', 'advance_deduction', 'other_deductions', 'total_deductions',
+    'total_salary', 'previous_due',
+)
+
+
+def _decode_breakdown(breakdown):
+    # Decimals are stored as strings by DjangoJSONEncoder, without loss of precision
+    return {
+        key: Decimal(value) if key in BREAKDOWN_DECIMAL_KEYS else value
+        for key, value in breakdown.items()
+    }
+
+
+def _compute_salary_chunk(employees, year, month, last_day, records, breakdowns):
+    working_days = calculate_working_days_bulk(employees, year, month, last_day)
+    deductions = calculate_deductions_bulk(employees, year, month)
+    previous_dues = calculate_previous_dues(employees, year, month)
+    for employee in employees:
+        present_days, absent_days, sunday_count, approved_leave_count = working_days[employee.id]
+        basic = employee.basic_salary or Decimal(0)
+        hra = employee.house_rent_allowance or Decimal(0)
+        transport = employee.transportation_allowance or Decimal(0)
+        col_allowance = employee.cost_of_living_allowance or Decimal(0)
+        total_allowance = hra + transport + col_allowance
+        gross_basic = basic + total_allowance
+        total_days_in_month = monthrange(year, month)[1]
+        daily_salary = gross_basic / total_days_in_month
+        paid_days = present_days + sunday_count + approved_leave_count
+        salary_on_attendance = daily_salary * paid_days
+        advance_deduction, other_deductions = deductions[employee.id]
+        total_deductions = advance_deduction + other_deductions
+        total_salary = salary_on_attendance - total_deductions
+
+        previous_due = previous_dues[employee.id]
 
+        records.append(SalaryRecord(
+            employee=employee,
+            year=year,
+            month=month,
+            present_days=present_days,
+            absent_days=absent_days,
+            lop_count=absent_days,
+            total_allowances=total_allowance,
+            total_deductions=total_deductions,
+            gross_salary=total_salary,
+            salary_due=previous_due,
+            status='pending',
+        ))
+        breakdowns.append({
+            'present_days': present_days,
+            'absent_days': absent_days,
+            'sunday_count': sunday_count,
+            'approved_leave_count': approved_leave_count,
+            'basic': basic,
+            'gross_basic': gross_basic,
+            'hra': hra,
+            'transport': transport,
+            'col_allowance': col_allowance,
+            'total_allowance': total_allowance,
+            'salary_on_attendance': salary_on_attendance,
+            'advance_deduction': advance_deduction,
+            'other_deductions': other_deductions,
+            'total_deductions': total_deductions,
+            'total_salary': total_salary,
+            'previous_due': previous_due,
+        })
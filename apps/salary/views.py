@@ -1,23 +1,24 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from apps.attendance.models import Attendance, Leave
 from apps.employees.models import EmployeeProfile
-from .models import SalaryRecord, Allowance, Deduction
-from .serializers import AllowanceSerializer, SalaryRecordSerializer, DeductionSerializer
-from .utils import calculate_deductions, calculate_working_days
-from datetime import date
-from calendar import monthrange
+from .models import SalaryRecord, Allowance, Deduction, PayrollRun
+from .serializers import AllowanceSerializer, SalaryRecordSerializer, DeductionSerializer, PayrollRunSerializer, salary_record_values
+from .tasks import enqueue_payroll_run
+from .utils import compute_salary_results
 from rest_framework import viewsets
 from decimal import Decimal
-from apps.employees.models import EmployeeAllowance, EmployeeDeduction
-from django.db.models import Sum
+from apps.employees.models import EmployeeDeduction
+from django.conf import settings
 from django.utils import timezone
 from rest_framework import status
 from django.http import HttpResponse
+from payroll_system.filters import choice_param, integer_param
+from payroll_system.pagination import KeysetPagination
+from payroll_system.report_cache import cached_report
+from payroll_system.values_serializers import ValuesListMixin
 import io
 
 
-
 class AllowanceViewSet(viewsets.ModelViewSet):
     queryset = Allowance.objects.all()
     serializer_class = AllowanceSerializer
@@ -26,105 +27,25 @@ class DeductionViewSet(viewsets.ModelViewSet):
     queryset = Deduction.objects.all()
     serializer_class = DeductionSerializer
 
-class SalaryRecordViewSet(viewsets.ModelViewSet):
+class SalaryRecordViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = SalaryRecord.objects.all().order_by('-generated_on')
     serializer_class = SalaryRecordSerializer
+    values_serializer = salary_record_values
+    query_filters = {
+        'year': ('year', integer_param),
+        'month': ('month', integer_param),
+        'status': ('status', choice_param(SalaryRecord.STATUS_CHOICES)),
+        'employee': ('employee_id', integer_param),
+    }
+    pagination_class = KeysetPagination
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('employee')
+
+class PayrollRunViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = PayrollRun.objects.all().order_by('-created_at')
+    serializer_class = PayrollRunSerializer
 
-def compute_salary_results(year, month):
-    today = date.today()
-    if year == today.year and month == today.month:
-        last_day = today.day
-    else:
-        last_day = monthrange(year, month)[1]
-    results = []
-    employees = EmployeeProfile.objects.all()
-    for employee in employees:
-        present_days, absent_days, sunday_count, approved_leave_count = calculate_working_days(employee, year, month, last_day)
-        basic = employee.basic_salary or Decimal(0)
-        hra = employee.house_rent_allowance or Decimal(0)
-        transport = employee.transportation_allowance or Decimal(0)
-        col_allowance = employee.cost_of_living_allowance or Decimal(0)
-        total_allowance = hra + transport + col_allowance
-        gross_basic = basic + total_allowance
-        total_days_in_month = monthrange(year, month)[1]
-        daily_salary = gross_basic / total_days_in_month
-        paid_days = present_days + sunday_count + approved_leave_count
-        salary_on_attendance = daily_salary * paid_days
-        advance_deduction, other_deductions = calculate_deductions(employee, year, month)
-        total_deductions = advance_deduction + other_deductions
-        total_salary = salary_on_attendance - total_deductions
-
-       #Bug fix of balance amount
-
-        previous_due_records = SalaryRecord.objects.filter(
-            employee=employee,
-            status__in=["pending", "partially_paid"],
-        ).exclude(year=year, month=month)
- 
-        previous_due = Decimal(0)
-        for rec in previous_due_records:
-            if rec.balance_amount and rec.balance_amount > 0:
-                previous_due += rec.balance_amount
-            else:
-                # Fallback: balance not yet computed, derive it
-                previous_due += max(Decimal(0), rec.gross_salary - (rec.paid_amount or Decimal(0)))
-
-        # previous_due = SalaryRecord.objects.filter(employee=employee, status="pending").exclude(year=year, month=month).aggregate(total_due=Sum('gross_salary'))['total_due'] or Decimal(0)
-        
-        salary_record, created = SalaryRecord.objects.get_or_create(
-            employee=employee,
-            year=year,
-            month=month,
-            defaults={
-                'present_days': present_days,
-                'absent_days': absent_days,
-                'lop_count': absent_days,
-                'total_allowances': total_allowance,
-                'total_deductions': total_deductions,
-                'gross_salary': total_salary,
-                'salary_due': previous_due,
-                'status': 'pending',
-            }
-        )
-        if not created:
-            salary_record.present_days = present_days
-            salary_record.absent_days = absent_days
-            salary_record.lop_count = absent_days
-            salary_record.total_allowances = total_allowance
-            salary_record.total_deductions = total_deductions
-            salary_record.gross_salary = total_salary
-            salary_record.salary_due = previous_due
-            salary_record.save()
-        # Round all monetary values to 2 decimal places
-        cents = Decimal('0.01')
-        results.append({
-            'id': salary_record.id,
-            'employee_id': employee.id,
-            'employee_name': employee.name,
-            'employee_number': employee.employee_code,
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'leave_count': sunday_count,
-            'approved_leave_count': approved_leave_count,
-            'basic_salary': float(basic.quantize(cents)),
-            'gross_basic_salary': float(gross_basic.quantize(cents)),
-            'house_rent_allowance': float(hra.quantize(cents)),
-            'transportation_allowance': float(transport.quantize(cents)),
-            'cost_of_living_allowance': float(col_allowance.quantize(cents)),
-            'total_allowance': float(total_allowance.quantize(cents)),
-            'salary_on_attendance': float(salary_on_attendance.quantize(cents)),
-            'advance_deduction': float(advance_deduction.quantize(cents)),
-            'other_deductions': float(other_deductions.quantize(cents)),
-            'total_deduction': float(total_deductions.quantize(cents)),
-            'total_salary': float(total_salary.quantize(cents)),
-            'holiday_count': sunday_count,
-            'status': salary_record.status,
-            'paid_amount': float(salary_record.paid_amount.quantize(cents)) if salary_record.paid_amount else 0.0,
-            'balance_amount': float((salary_record.balance_amount or ((salary_record.gross_salary + salary_record.salary_due) - (salary_record.paid_amount or Decimal(0)))).quantize(cents)),
-            'paid_date': salary_record.paid_date,
-        })
-    return results
 
 # class GenerateSalaryAPIView(APIView):
 #     def post(self, request):
@@ -133,6 +54,12 @@ def compute_salary_results(year, month):
 #         results = compute_salary_results(year, month)
 #         return Response(results)
 
+def _flag(request, name):
+    """Read a boolean option from the request body or query string."""
+    value = request.data.get(name, request.query_params.get(name, ''))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
 class GenerateSalaryAPIView(APIView):
     def post(self, request):
         # Input validation: return a clear 400 if year/month are missing or invalid
@@ -149,8 +76,21 @@ class GenerateSalaryAPIView(APIView):
                 {"error": "month must be between 1 and 12."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
- 
-        results = compute_salary_results(year, month)
+
+        # With parallel=true the employees are computed across PAYROLL_WORKERS processes.
+        parallel = _flag(request, 'parallel')
+        workers = settings.PAYROLL_WORKERS if parallel else 1
+
+        # With async=true the month is queued for the payroll worker and the run id
+        # is returned immediately; poll /api/salary/runs/<id>/ for progress and results.
+        run_async = _flag(request, 'async')
+        if run_async:
+            run = enqueue_payroll_run(year, month, workers=workers)
+            return Response(PayrollRunSerializer(run).data, status=status.HTTP_202_ACCEPTED)
+
+        # Only employees whose inputs changed are recomputed unless full=true is passed.
+        full = _flag(request, 'full')
+        results = compute_salary_results(year, month, workers=workers, full=full)
         return Response(results)
  
 
@@ -211,8 +151,36 @@ class PaySalaryAPIView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+def salary_report_queryset(request, year, month):
+    """
+    Salary records for a report. Reports read the persisted records, so closed months are
+    served as they were generated; payroll is only (re)computed with ?refresh=1 or when
+    the month has never been generated.
+    """
+    qs = SalaryRecord.objects.select_related('employee').filter(year=year, month=month)
+    if _flag(request, 'refresh') or not qs.exists():
+        compute_salary_results(year, month)
+    return qs
+
+
+def salary_report_sources(year, month):
+    return [
+        (SalaryRecord.objects.filter(year=year, month=month), ['generated_on', 'updated_at']),
+        (EmployeeProfile.objects.all(), ['created_at', 'updated_at']),
+    ]
+
+
 class SalaryReportPDFAPIView(APIView):
     def get(self, request):
+        year = int(request.query_params.get('year'))
+        month = int(request.query_params.get('month'))
+        qs = salary_report_queryset(request, year, month)
+        return cached_report(
+            request, 'salary_report.pdf', {'year': year, 'month': month},
+            salary_report_sources(year, month), lambda: self.render(qs, year, month),
+        )
+
+    def render(self, qs, year, month):
         try:
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
             from reportlab.lib.pagesizes import A4, landscape
@@ -221,10 +189,6 @@ class SalaryReportPDFAPIView(APIView):
             import calendar
         except ImportError:
             return HttpResponse("PDF generation library not installed", status=501)
-        year = int(request.query_params.get('year'))
-        month = int(request.query_params.get('month'))
-        compute_salary_results(year, month)
-        qs = SalaryRecord.objects.select_related('employee').filter(year=year, month=month)
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), leftMargin=20, rightMargin=20, topMargin=20, bottomMargin=20)
         styles = getSampleStyleSheet()
@@ -282,61 +246,37 @@ class SalaryReportPDFAPIView(APIView):
 
 class SalaryReportExcelAPIView(APIView):
     def get(self, request):
+        year = int(request.query_params.get('year'))
+        month = int(request.query_params.get('month'))
+        qs = salary_report_queryset(request, year, month)
+        return cached_report(
+            request, 'salary_report.xlsx', {'year': year, 'month': month},
+            salary_report_sources(year, month), lambda: self.render(qs, year, month),
+        )
+
+    def render(self, qs, year, month):
         try:
-            from openpyxl import Workbook
-            from openpyxl.utils import get_column_letter
+            from payroll_system.exports import xlsx_response
         except ImportError:
             return HttpResponse("Excel generation library not installed", status=501)
-        year = int(request.query_params.get('year'))
-        month = int(request.query_params.get('month'))
-        compute_salary_results(year, month)
-        qs = SalaryRecord.objects.select_related('employee').filter(year=year, month=month)
-        wb = Workbook()
-        ws = wb.active
-        ws.title = f"Salaries {month:02d}-{year}"
         headers = ["ID","Employee","Code","Year","Month","Present Days","Absent Days","LOP","Total Allowances","Total Deductions","Gross Salary","Salary Due","Paid Amount","Balance Amount","Status","Paid Date","Generated On"]
-        transformed = []
-        for h in headers:
-            parts = h.split()
-            if len(parts) == 2:
-                transformed.append(f"{parts[0]}\n{parts[1]}")
-            else:
-                transformed.append(h)
-        ws.append(transformed)
-        for s in qs:
-            ws.append([
-                s.id,
-                s.employee.name,
-                s.employee.employee_code,
-                s.year,
-                s.month,
-                s.present_days,
-                s.absent_days,
-                s.lop_count,
-                float(s.total_allowances or 0),
-                float(s.total_deductions or 0),
-                float(s.gross_salary or 0),
-                float(s.salary_due or 0),
-                float(s.paid_amount or 0),
-                float(s.balance_amount or 0),
-                s.status,
-                s.paid_date.isoformat() if s.paid_date else "",
-                (s.generated_on.date().isoformat() if s.generated_on else ""),
-            ])
-        from openpyxl.styles import Alignment
-        for cell in ws[1]:
-            cell.alignment = Alignment(wrap_text=True, horizontal="center")
-        for col in range(1, len(headers) + 1):
-            max_length = 0
-            column = get_column_letter(col)
-            for cell in ws[column]:
-                val = str(cell.value) if cell.value is not None else ""
-                if len(val) > max_length:
-                    max_length = len(val)
-            ws.column_dimensions[column].width = min(max_length + 2, 25)
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        resp = HttpResponse(buffer.getvalue(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        resp['Content-Disposition'] = f'attachment; filename="salary_report_{month:02d}_{year}.xlsx"'
-        return resp
+        rows = ([
+            s.id,
+            s.employee.name,
+            s.employee.employee_code,
+            s.year,
+            s.month,
+            s.present_days,
+            s.absent_days,
+            s.lop_count,
+            float(s.total_allowances or 0),
+            float(s.total_deductions or 0),
+            float(s.gross_salary or 0),
+            float(s.salary_due or 0),
+            float(s.paid_amount or 0),
+            float(s.balance_amount or 0),
+            s.status,
+            s.paid_date.isoformat() if s.paid_date else "",
+            (s.generated_on.date().isoformat() if s.generated_on else ""),
+        ] for s in qs.iterator())
+        return xlsx_response(f"salary_report_{month:02d}_{year}.xlsx", f"Salaries {month:02d}-{year}", headers, rows)
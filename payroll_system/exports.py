@@ -0,0 +1,69 @@
+"""
+Streaming .xlsx export shared by the report views.
+
+Rows are spooled to a temporary file while the widest value of each column is
+measured, then written through an openpyxl write-only worksheet into a second
+temporary file that is returned as a FileResponse. Memory use does not depend on
+the number of rows.
+"""
+import pickle
+import tempfile
+
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MAX_COLUMN_WIDTH = 25
+
+
+def xlsx_response(filename, sheet_title, headers, rows):
+    """
+    Build an .xlsx attachment with a single sheet.
+    `rows` is any iterable of lists (typically a generator over queryset.iterator()).
+    Two-word headers are split over two lines; column widths fit the longest value, capped at MAX_COLUMN_WIDTH.
+    """
+    header_values = []
+    for h in headers:
+        parts = h.split()
+        if len(parts) == 2:
+            header_values.append(f"{parts[0]}\n{parts[1]}")
+        else:
+            header_values.append(h)
+    widths = [len(h) for h in header_values]
+
+    with tempfile.TemporaryFile() as spool:
+        for row in rows:
+            for col, value in enumerate(row):
+                length = len(str(value)) if value is not None else 0
+                if length > widths[col]:
+                    widths[col] = length
+            pickle.dump(row, spool, pickle.HIGHEST_PROTOCOL)
+        spool.seek(0)
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_title)
+        # Column widths have to be set before the first row is written
+        for col, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+        header_cells = []
+        for value in header_values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.alignment = Alignment(wrap_text=True, horizontal="center")
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        while True:
+            try:
+                ws.append(pickle.load(spool))
+            except EOFError:
+                break
+
+        output = tempfile.TemporaryFile()
+        wb.save(output)
+
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
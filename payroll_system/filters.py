@@ -0,0 +1,75 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class QueryParamFilter(BaseFilterBackend):
+    """
+    Filters a view's queryset in SQL from its `query_filters`, a mapping of query
+    parameter to (field lookup, parser). Empty parameters are ignored; values the
+    parser rejects are a 400 naming the parameter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return queryset.filter(**parse_query_filters(request, getattr(view, 'query_filters', {})))
+
+
+def parse_query_filters(request, query_filters):
+    """Field lookups and values of the query parameters in query_filters present on the request."""
+    filters = {}
+    for param, (lookup, parse) in query_filters.items():
+        value = request.query_params.get(param)
+        if not value:
+            continue
+        try:
+            filters[lookup] = parse(value)
+        except ValueError as exc:
+            raise ValidationError({param: str(exc)})
+    return filters
+
+
+def integer_param(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("A whole number is required.")
+
+
+def boolean_param(value):
+    if value.lower() in ('true', '1'):
+        return True
+    if value.lower() in ('false', '0'):
+        return False
+    raise ValueError("Use true or false.")
+
+
+def date_param(value):
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+    return parsed
+
+
+def datetime_param(value):
+    """An ISO 8601 datetime; one without an offset is taken in the current timezone."""
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError("Invalid datetime format. Use YYYY-MM-DDThh:mm[:ss][±hh:mm].")
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def choice_param(choices):
+    values = [value for value, _ in choices]
+
+    def parse(value):
+        if value not in values:
+            raise ValueError(f"Must be one of: {', '.join(values)}.")
+        return value
+    return parse
@@ -0,0 +1,36 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination, PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """Page-number pagination with a client-selectable page size, capped at max_page_size."""
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class LookupPagination(LimitOffsetPagination):
+    """Default for list endpoints: ?limit=&offset=, for small lookup tables where a total count is cheap."""
+    default_limit = settings.API_PAGE_SIZE
+    max_limit = settings.API_MAX_PAGE_SIZE
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination for high-volume tables: each page seeks past the last row of the
+    previous one on an indexed ordering instead of counting and skipping rows.
+    Views choose the ordering with `cursor_ordering`; it should be unique and indexed.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+def wants_pagination(request):
+    # Report endpoints keep returning a plain list unless the client asks for a page
+    return 'page' in request.query_params or 'page_size' in request.query_params
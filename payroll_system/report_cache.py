@@ -0,0 +1,160 @@
+"""
+File-system cache for generated report files (PDF/XLSX).
+
+A report is cached under a key made of its type, its parameters and a data
+version taken from the source tables (latest timestamp and row count, or a
+content hash for small lookup tables). Any change to the source data produces a
+new key, so cached files never need explicit invalidation; old entries are
+evicted least-recently-used once the cache exceeds REPORT_CACHE_MAX_BYTES.
+Responses carry an ETag and Last-Modified so clients can revalidate with a 304.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def data_version(sources):
+    """
+    Build (version string, last modified datetime or None) from `sources`, a list of
+    (queryset, timestamp_fields). With timestamp fields the queryset contributes its row
+    count and latest timestamp; without, a hash of its rows (meant for small lookup tables).
+    """
+    parts = []
+    last_modified = None
+    for queryset, fields in sources:
+        label = queryset.model._meta.label_lower
+        if not fields:
+            rows = list(queryset.order_by('pk').values_list())
+            digest = hashlib.sha256(repr(rows).encode()).hexdigest()[:16]
+            parts.append(f"{label}:{digest}")
+            continue
+        aggregates = queryset.aggregate(
+            row_count=Count('pk'),
+            **{f'latest_{field}': Max(field) for field in fields}
+        )
+        latest = max((aggregates[f'latest_{field}'] for field in fields if aggregates[f'latest_{field}']), default=None)
+        parts.append(f"{label}:{aggregates['row_count']}:{latest.isoformat() if latest else ''}")
+        if latest and (last_modified is None or latest > last_modified):
+            last_modified = latest
+    return "|".join(parts), last_modified
+
+
+def cached_report(request, report_type, params, sources, build):
+    """
+    Serve a report from the cache, building it with `build()` on a miss.
+    `build` returns the HttpResponse/FileResponse the view would have returned.
+    """
+    version, last_modified = data_version(sources)
+    key_source = json.dumps([report_type, params, version], sort_keys=True, default=str)
+    key = hashlib.sha256(key_source.encode()).hexdigest()
+    etag = f'"{key[:32]}"'
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is not None:
+        if response.status_code == 304:
+            _set_validators(response, etag, last_modified_ts)
+        return response
+
+    max_bytes = getattr(settings, 'REPORT_CACHE_MAX_BYTES', 0)
+    if not max_bytes:
+        response = build()
+        if response.status_code != 200:
+            return response
+    else:
+        cache_dir = settings.REPORT_CACHE_DIR
+        data_path = os.path.join(cache_dir, f"{key}.data")
+        meta_path = os.path.join(cache_dir, f"{key}.json")
+        meta = _read_meta(meta_path)
+        data = _open(data_path) if meta else None
+        if data is None:
+            response = build()
+            if response.status_code != 200:
+                return response
+            meta = _store(cache_dir, data_path, meta_path, response)
+            # Open before evicting: an entry larger than the whole cap is still served once
+            data = open(data_path, 'rb')
+            _evict(cache_dir, max_bytes)
+        else:
+            # Touch the entry so eviction is least-recently-used
+            os.utime(data_path)
+        response = FileResponse(data, content_type=meta['content_type'])
+        if meta.get('content_disposition'):
+            response['Content-Disposition'] = meta['content_disposition']
+
+    _set_validators(response, etag, last_modified_ts)
+    return response
+
+
+def _set_validators(response, etag, last_modified_ts):
+    response['ETag'] = etag
+    if last_modified_ts:
+        response['Last-Modified'] = http_date(last_modified_ts)
+
+
+def _open(data_path):
+    try:
+        return open(data_path, 'rb')
+    except OSError:
+        return None
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store(cache_dir, data_path, meta_path, response):
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to temporary files first so concurrent readers never see a partial entry
+    with tempfile.NamedTemporaryFile('wb', dir=cache_dir, delete=False) as tmp:
+        if response.streaming:
+            for chunk in response.streaming_content:
+                tmp.write(chunk)
+        else:
+            tmp.write(response.content)
+    response.close()
+    os.replace(tmp.name, data_path)
+
+    meta = {
+        'content_type': response['Content-Type'],
+        'content_disposition': response.get('Content-Disposition', ''),
+    }
+    with tempfile.NamedTemporaryFile('w', dir=cache_dir, delete=False) as tmp:
+        json.dump(meta, tmp)
+    os.replace(tmp.name, meta_path)
+    return meta
+
+
+def _evict(cache_dir, max_bytes):
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.data'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        for stale in (path, path[:-len('.data')] + '.json'):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+        total -= size
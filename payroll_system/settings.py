@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
@@ -36,6 +37,29 @@ ALLOWED_HOSTS = [h for h in _raw_hosts.split(',') if h]
 # ESSL Device Configuration
 ESSL_DEVICE_IP = os.getenv('ESSL_DEVICE_IP', '192.168.1.201')
 ESSL_DEVICE_PORT = int(os.getenv('ESSL_DEVICE_PORT', 4370))
+# Device polling: attempts per device, base backoff in seconds, and concurrent connections
+ESSL_POLL_RETRIES = int(os.getenv('ESSL_POLL_RETRIES', 3))
+ESSL_POLL_BACKOFF = float(os.getenv('ESSL_POLL_BACKOFF', 1.0))
+ESSL_POLL_WORKERS = int(os.getenv('ESSL_POLL_WORKERS', 8))
+# Background sync: seconds between scheduled syncs, and the lock lease used when
+# PostgreSQL advisory locks are unavailable
+ESSL_SYNC_INTERVAL = float(os.getenv('ESSL_SYNC_INTERVAL', 300))
+ESSL_SYNC_LEASE_SECONDS = int(os.getenv('ESSL_SYNC_LEASE_SECONDS', 600))
+# Months of punches kept in the hot EsslPunch table by `archive_essl_punches`
+ESSL_PUNCH_RETENTION_MONTHS = int(os.getenv('ESSL_PUNCH_RETENTION_MONTHS', 12))
+
+# Payroll generation: number of worker processes used when parallel mode is requested
+PAYROLL_WORKERS = int(os.getenv('PAYROLL_WORKERS', os.cpu_count() or 1))
+# Seconds without a progress heartbeat after which a running payroll run is failed and queued again
+PAYROLL_RUN_STALE_SECONDS = int(os.getenv('PAYROLL_RUN_STALE_SECONDS', 900))
+
+# Cache of generated PDF/XLSX reports; REPORT_CACHE_MAX_BYTES=0 disables it
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'payroll_report_cache'))
+REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# API list pages: default size, and the upper bound on the size a client may request
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
 
 CORS_ALLOW_ALL_ORIGINS = os.getenv('CORS_ALLOW_ALL_ORIGINS', 'True') == 'True'
 _raw_csrf = os.getenv('CSRF_TRUSTED_ORIGINS', '')
@@ -132,6 +156,8 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'payroll_system.pagination.LookupPagination',
+    'DEFAULT_FILTER_BACKENDS': ['payroll_system.filters.QueryParamFilter'],
 }
 
 
@@ -0,0 +1,40 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class ListQueryCountMixin:
+    """
+    TestCase mixin asserting that a router's list endpoints run a fixed, bounded
+    number of queries however many rows they return, i.e. that every relation the
+    serializers follow is joined or prefetched by the viewset's queryset.
+    """
+    max_list_queries = 4
+    list_rows = 5
+
+    def assertListQueriesBounded(self, router, factories):
+        """
+        factories maps each prefix registered on the router to a callable creating one row
+        of its list; every registered prefix must have one so new viewsets are not missed.
+        """
+        self.assertEqual(sorted(factories), sorted(prefix for prefix, _, _ in router.registry))
+        for prefix, viewset, basename in router.registry:
+            with self.subTest(prefix):
+                url = reverse(f'{basename}-list')
+                factories[prefix]()
+                few_queries, few_rows = self.list_query_count(url)
+                for _ in range(self.list_rows - 1):
+                    factories[prefix]()
+                many_queries, many_rows = self.list_query_count(url)
+
+                self.assertGreater(many_rows, few_rows)
+                self.assertEqual(few_queries, many_queries, f"{url} runs queries per row")
+                self.assertLessEqual(many_queries, self.max_list_queries)
+
+    def list_query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        rows = data['results'] if isinstance(data, dict) else data
+        return len(queries), len(rows)